@@ -1,135 +1,251 @@
+import json
+import os
 import sys
-import re
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 # Import from audit script
 import audit_sc_native
+from dcb_reader import DataCoreError
+from ini_cache import file_digest
+from ini_index import IniIndex, map_ini
 
-def load_ini_lines(ini_path: Path) -> List[str]:
-    """Load INI file as a list of lines."""
-    with open(ini_path, 'r', encoding='utf-8') as f:
-        return f.readlines()
+PATCH_PATH = Path("fixes.patch.json")  # record of the last applied fixes
+PATCH_VERSION = 1
 
-def save_ini_lines(ini_path: Path, lines: List[str]):
+def load_ini_lines(ini: IniIndex, updates: Dict[str, str], key_lines: Optional[Dict[str, int]] = None) -> List[str]:
+    """
+    Build the INI line list with updated values, only when there is something to save.
+    key_lines (e.g. from the audit results) saves mapping every key to its line.
+    """
+    lines = ini.lines(keepends=True)
+    if key_lines is not None and all(key in key_lines for key in updates):
+        key_map = key_lines
+    else:
+        key_map = map_ini_keys_to_lines(ini)
+    for key, value in updates.items():
+        idx = key_map[key]
+        raw_key = lines[idx].split('=', 1)[0]
+        lines[idx] = f"{raw_key}={value}\n"
+    return lines
+
+def save_ini_lines(ini_path: Path, lines: List[str], encoding: str = 'utf-8'):
     """Save lines back to INI file."""
-    with open(ini_path, 'w', encoding='utf-8') as f:
+    with open(ini_path, 'w', encoding=encoding) as f:
         f.writelines(lines)
 
-def map_ini_keys_to_lines(lines: List[str]) -> Dict[str, int]:
-    """Map INI keys to their line numbers for in-place updates."""
-    key_map = {}
-    for i, line in enumerate(lines):
-        line = line.strip()
-        # Skip comments and empty lines
-        if not line or line.startswith(';') or line.startswith('#') or '=' not in line:
+def map_ini_keys_to_lines(ini: IniIndex) -> Dict[str, int]:
+    """Map INI keys to their line numbers for in-place updates (from the shared index)."""
+    return ini.line_numbers()
+
+def map_changed_spans(ini: IniIndex, updates: Dict[str, str]) -> List[Tuple[int, int, int, str]]:
+    """
+    Byte position of every updated value, in file order: (offset, length, line, key).
+    A span covers everything after '=' up to the line ending, like the "key=value"
+    line rewrite. The spans come from the shared index; line numbers are counted on the way.
+    """
+    spans = sorted(ini.raw_span(key) + (key,) for key in updates)
+    changed = []
+    line = 0
+    pos = ini.data_start
+    for offset, length, key in spans:
+        line += ini.buffer[pos:offset].count(b"\n")
+        pos = offset
+        changed.append((offset, length, line, key))
+    return changed
+
+def can_patch_in_place(ini: IniIndex) -> bool:
+    """Byte splicing needs the buffer to hold the original file bytes (not transcoded UTF-16)."""
+    return ini.output_encoding != "utf-16"
+
+def unencodable_keys(ini: IniIndex, updates: Dict[str, str]) -> List[str]:
+    """Keys whose new value cannot be written in the file's encoding (e.g. "™" in a latin-1 ini)."""
+    bad = []
+    for key, value in updates.items():
+        try:
+            value.encode(ini.encoding)
+        except UnicodeEncodeError:
+            bad.append(key)
+    return bad
+
+def save_patched_ini(ini: IniIndex, updates: Dict[str, str], ini_path: Path,
+                     patch_path: Optional[Path] = PATCH_PATH) -> List[Dict]:
+    """
+    Write the ini with only the updated values replaced.
+    Unchanged byte ranges are copied straight from the (mapped) buffer through a
+    memoryview, so nothing else is decoded or re-encoded and line endings, BOM and
+    trailing text stay byte-identical. Closes ini before replacing the file.
+    Values the file's encoding cannot hold are reported and left out, before
+    anything is written.
+    Returns the change list, which is also saved to patch_path for review or reapplying.
+    """
+    ini_path = Path(ini_path)
+    bad_keys = unencodable_keys(ini, updates)
+    if bad_keys:
+        for key in bad_keys:
+            print(f"  Skipping {key}: '{updates[key]}' cannot be written as {ini.encoding}")
+        updates = {key: value for key, value in updates.items() if key not in bad_keys}
+    changes = []
+    base_digest = file_digest(ini.buffer).hex()
+    tmp_path = ini_path.with_name(ini_path.name + ".tmp")
+    
+    with open(tmp_path, "wb") as f, memoryview(ini.buffer) as view:
+        pos = 0
+        for offset, length, line, key in map_changed_spans(ini, updates):
+            new_bytes = updates[key].encode(ini.encoding)
+            f.write(view[pos:offset])
+            f.write(new_bytes)
+            pos = offset + length
+            changes.append({
+                'key': key,
+                'line': line,
+                'offset': offset,
+                'old': bytes(view[offset:offset + length]).decode(ini.encoding, errors="replace"),
+                'new': updates[key],
+            })
+        f.write(view[pos:])
+    
+    # Release the mapping before overwriting the file (required on Windows)
+    ini.close()
+    os.replace(tmp_path, ini_path)
+    
+    if patch_path is not None:
+        write_patch(patch_path, ini_path, base_digest, changes)
+    return changes
+
+def write_patch(patch_path: Path, ini_path: Path, base_digest: str, changes: List[Dict]):
+    """Save a compact change list: one entry per key with its old and new value."""
+    patch = {
+        'version': PATCH_VERSION,
+        'ini': Path(ini_path).name,
+        'base_digest': base_digest,
+        'result_digest': file_digest(Path(ini_path).read_bytes()).hex(),
+        'changes': changes,
+    }
+    with open(patch_path, "w", encoding="utf-8") as f:
+        json.dump(patch, f, ensure_ascii=False, indent=1)
+
+def apply_patch(ini_path: Path, patch_path: Path) -> int:
+    """
+    Reapply a saved patch to an ini file (e.g. a freshly merged one).
+    Values that already match are skipped; values that differ from both the old
+    and the new text are reported and left alone. Returns the number of updates.
+    """
+    with open(patch_path, "r", encoding="utf-8") as f:
+        patch = json.load(f)
+    if patch.get('version') != PATCH_VERSION:
+        print(f"ERROR: Unsupported patch file {patch_path}")
+        return 0
+    
+    ini = map_ini(ini_path)
+    updates = {}
+    for change in patch['changes']:
+        key = change['key']
+        current = ini.get(key)
+        if current is None:
+            print(f"  Skipping {key}: not in {Path(ini_path).name}")
+        elif current.strip() == change['new'].strip():
             continue
-        
-        # Split on first '='
-        key = line.split('=', 1)[0].strip()
-        key_map[key] = i
-    return key_map
+        elif current.strip() != change['old'].strip():
+            print(f"  Skipping {key}: value changed since the patch was made ('{current}')")
+        else:
+            updates[key] = change['new']
+    
+    if not updates:
+        ini.close()
+        return 0
+    if can_patch_in_place(ini):
+        return len(save_patched_ini(ini, updates, ini_path, patch_path=None))
+    else:
+        lines = load_ini_lines(ini, updates)
+        ini.close()
+        save_ini_lines(ini_path, lines, ini.output_encoding)
+    return len(updates)
 
-def apply_fixes(libs_dir: Path, name_dict: Dict[str, str], ini_path: Path, lines: List[str]):
+def apply_fixes(libs_dir: Path, name_dict: IniIndex, ini_path: Path, workers: int = None, use_index: bool = True,
+                results: Optional[Dict] = None, dcb_file: Optional[Path] = None):
+    """
+    Rewrite names that do not follow their naming rule.
+    Pass the saved audit results to skip the component scan; without them the
+    components are read from dcb_file (if given) or the XMLs under libs_dir and
+    audited here.
+    """
     print("=" * 60)
     print("Star Citizen Language Pack Fixer")
     print("=" * 60)
     
-    # Generate key map
-    print("Mapping INI keys...")
-    key_map = map_ini_keys_to_lines(lines)
-    
-    print("Scanning components...")
-    # Pass name_dict although it might not be used by the walker itself, it's required by signature
-    components = audit_sc_native.walk_component_xmls(libs_dir, name_dict)
-    print(f"Found {len(components)} components.")
+    if results is None:
+        print("Scanning components...")
+        components = None
+        if dcb_file is not None:
+            try:
+                components = audit_sc_native.read_components_from_dcb(dcb_file)
+            except (OSError, DataCoreError) as e:
+                print(f"Could not read {dcb_file.name} directly ({e}), using the component XMLs")
+        if components is None:
+            # Pass name_dict although it might not be used by the walker itself, it's required by signature
+            components = audit_sc_native.walk_component_xmls(libs_dir, name_dict, workers, use_index)
+        print(f"Found {len(components)} components.")
+        # Same naming checks as the audit
+        results = audit_sc_native.audit_language_pack(components, ini_path, name_dict)
+    else:
+        print(f"Using saved audit results ({len(results['resolved'])} names, no rescan needed).")
     
     # 4. Apply Fixes
-    updates_count = 0
-    skipped_placeholders = 0
-    
-    class_prefix_map = {
-        'Military': 'M',
-        'Civilian': 'C',
-        'Industrial': 'I',
-        'Stealth': 'S',
-        'Competition': 'R', 
-    }
+    updates = {}
+    key_lines = {}
+    skipped_placeholders = results['placeholders_ignored']
     
     print("\nApplying fixes...")
     
-    for comp in components:
-        # Resolve Description to find Class
-        desc_token = comp.description_token.lstrip('@')
-        description_text = name_dict.get(desc_token, "")
-        
-        class_match = re.search(r"Class:\s*(\w+)", description_text, re.IGNORECASE)
-        item_class = class_match.group(1).capitalize() if class_match else "Unknown"
-        
-        type_prefix = class_prefix_map.get(item_class, 'C') # Default to C
-        
-        # Construct Expected Prefix Code
-        expected_code = f"{type_prefix}{comp.size}{comp.grade}"
-        
-        # Get Current Name
-        comp_token = comp.token.lstrip('@')
-        if comp_token not in key_map:
-            # Component not in INI?
-            continue
-            
-        current_line_idx = key_map[comp_token]
-        current_line = lines[current_line_idx]
-        
-        # Parse key=value
-        parts = current_line.split('=', 1)
-        key = parts[0]
-        current_value = parts[1].strip()
-        
-        # Ignore Placeholders
-        if "PLACEHOLDER" in current_value:
-            skipped_placeholders += 1
-            continue
-            
-        # Parse Base Name
-        # Regex to find existing prefix: ^[A-Z][0-9][A-Z]\s+
-        # Example: "C1A PowerBolt" -> Prefix="C1A", Base="PowerBolt"
-        match = re.match(r"^([A-Z][0-9][A-Z])\s+(.*)", current_value)
-        if match:
-            existing_prefix = match.group(1)
-            base_name = match.group(2)
-        else:
-            existing_prefix = None
-            base_name = current_value
-            
-        # Construct New Value
-        new_value = f"{expected_code} {base_name}"
+    for item in results['resolved']:
+        # The audit already resolved the key and built the fixed value
+        # Example: "C1A PowerBolt" -> "M1A PowerBolt", "Omnisky-3" -> "Omnisky-3 S1"
+        comp_token = item['key']
+        current_value = item['actual'].strip()
+        new_value = item['fix']
         
-        if new_value != current_value:
+        if new_value != current_value and comp_token not in updates:
             print(f"Updating {comp_token}:")
             print(f"  Old: '{current_value}'")
             print(f"  New: '{new_value}'")
-            lines[current_line_idx] = f"{key}={new_value}\n"
-            updates_count += 1
+            updates[comp_token] = new_value
+            if 'line' in item:
+                key_lines[comp_token] = item['line']
             
-    # 5. Save
-    print("\n" + "-" * 60)
-    print(f"Summary:")
-    print(f"  Updates Applied: {updates_count}")
-    print(f"  Placeholders Skipped: {skipped_placeholders}")
-    
-    if updates_count > 0:
+    # 5. Save (values the file's encoding cannot hold are skipped, so count what was written)
+    applied = 0
+    if updates:
         print(f"Saving updates to {ini_path}...")
-        save_ini_lines(ini_path, lines)
+        if can_patch_in_place(name_dict):
+            applied = len(save_patched_ini(name_dict, updates, ini_path))
+            print(f"Patch written to {PATCH_PATH.absolute()}")
+        else:
+            lines = load_ini_lines(name_dict, updates, key_lines)
+            # Release the mapping before overwriting the file (required on Windows)
+            name_dict.close()
+            save_ini_lines(ini_path, lines, name_dict.output_encoding)
+            applied = len(updates)
         print("Done.")
     else:
         print("No updates needed.")
 
+    print("\n" + "-" * 60)
+    print(f"Summary:")
+    print(f"  Updates Applied: {applied}")
+    print(f"  Placeholders Skipped: {skipped_placeholders}")
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description='Star Citizen Language Pack Fixer')
     parser.add_argument('--version', default='4.4.0', help='Game version (e.g., 4.4.0)')
     parser.add_argument('--channel', default='LIVE', help='Game channel (e.g., PTU, LIVE)')
     parser.add_argument('--extract-dir', default=None, help='Temporary directory where game data is extracted')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for XML parsing (default: all cores, 1 = serial)')
+    parser.add_argument('--no-index', action='store_true', help='Ignore the component index and parse every XML again')
+    parser.add_argument('--apply-patch', default=None, help='Reapply a saved fixes patch file to the language pack and exit')
+    parser.add_argument('--rescan', action='store_true', help='Ignore saved audit results and scan the components again')
+    parser.add_argument('--unforge', action='store_true', help='Scan the unforged component XMLs instead of reading the extracted DCB')
     args = parser.parse_args()
 
     # Setup paths
@@ -140,17 +256,6 @@ if __name__ == "__main__":
     else:
         EXTRACT_DIR = REPO_ROOT / "extracted"
     
-    # Check for extracted data
-    libs_dir = EXTRACT_DIR / "dcb" / "Data" / "libs"
-    if not libs_dir.exists():
-        # Try alternate path
-        libs_dir = EXTRACT_DIR / "dcb" / "Data" / "Libs"
-    
-    if not libs_dir.exists():
-        print(f"ERROR: Component data not found at {libs_dir}")
-        print("Please run audit_sc_native.py first to extract data.")
-        sys.exit(1)
-
     # Find Language Pack global.ini
     lang_pack_path = REPO_ROOT / args.version / args.channel / "data" / "Localization" / "english" / "global.ini"
     
@@ -160,15 +265,38 @@ if __name__ == "__main__":
         
     print(f"Target Language Pack: {lang_pack_path}")
     
-    # Load data
-    print("Loading INI lines...")
-    lines = load_ini_lines(lang_pack_path)
+    if args.apply_patch:
+        count = apply_patch(lang_pack_path, Path(args.apply_patch))
+        print(f"Applied {count} changes from {args.apply_patch}")
+        sys.exit(0)
     
+    # Load data (memory-mapped; lines are only built if there is something to save)
     print("Parsing INI for name dictionary...")
     name_dict = audit_sc_native.parse_global_ini(lang_pack_path)
     
     if not name_dict:
         print("ERROR: Failed to parse language pack")
         sys.exit(1)
-
-    apply_fixes(libs_dir, name_dict, lang_pack_path, lines)
+    
+    # Reuse the audit's results if they were made for this exact file
+    results = None if args.rescan else audit_sc_native.load_audit_results(lang_pack_path, name_dict)
+    
+    # Check for extracted data (only needed when scanning)
+    libs_dir = EXTRACT_DIR / "dcb" / "Data" / "libs"
+    if not libs_dir.exists():
+        # Try alternate path
+        libs_dir = EXTRACT_DIR / "dcb" / "Data" / "Libs"
+    
+    # The extracted DataCore is read directly; the XMLs are only needed without it
+    dcb_file = None
+    if not args.unforge:
+        dcb_file = next((p for p in (EXTRACT_DIR / "dcb" / "Data" / "Game2.dcb",
+                                     EXTRACT_DIR / "dcb" / "Data" / "Game.dcb") if p.exists()), None)
+    
+    if results is None and dcb_file is None and not libs_dir.exists():
+        print(f"ERROR: Component data not found at {libs_dir}")
+        print("Please run audit_sc_native.py first to extract data.")
+        sys.exit(1)
+    
+    with name_dict:
+        apply_fixes(libs_dir, name_dict, lang_pack_path, args.workers, not args.no_index, results, dcb_file)
@@ -1,18 +1,28 @@
 """
 Star Citizen Language Pack Auditor (Native Extraction)
 
-Uses unp4k.exe and unforge.exe to extract component data from Data.p4k
-and audit against the language pack naming conventions.
+Reads Game2.dcb and global.ini straight from Data.p4k (unp4k.exe as fallback),
+reads the component records straight from Game2.dcb (unforge.exe and the XML
+walk as fallback) and audits them against the language pack naming conventions.
 """
 
+import json
 import os
+import shlex
 import sys
 import subprocess
 import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional
 import re
 
+from component_index import ComponentIndex, build_manifest, load_manifest, manifest_files, write_manifest
+from dcb_reader import DataCore, DataCoreError
+from ini_cache import file_digest
+from ini_index import IniIndex, casefold_keys, map_ini
+from naming_rules import RULES_BY_TYPE, manifest_layout, resolve_class, rule_for
+from p4k_extract import P4kTarget, extract_targets
+
 # Configuration
 SC_INSTALL_PATH = r"C:\Program Files\Roberts Space Industries\StarCitizen\LIVE"
 REPO_ROOT = Path.cwd()
@@ -21,12 +31,19 @@ EXTRACT_DIR = REPO_ROOT / "extracted"
 UNP4K_EXE = TOOLS_DIR / "unp4k.exe"
 UNFORGE_EXE = TOOLS_DIR / "unforge.exe"
 
+STREAM_BLOCK = 4096  # Bytes fed to the XML parser at a time; AttachDef sits near the top
+AUDIT_RESULTS = Path("audit_results.json")  # read by apply_fixes.py
+AUDIT_RESULTS_VERSION = 1
+EXTRACTOR_VERSION = 3  # Bump when extraction changes so the component index is rebuilt
+
 
 class ComponentData:
     """Represents a ship component with auditable fields."""
-    def __init__(self, name: str, token: str, size: int, comp_type: str, grade: str, description_token: str = ""):
+    def __init__(self, name: str, token: str, size: int, comp_type: str, grade: str, description_token: str = "",
+                 short_token: str = ""):
         self.name = name
         self.token = token
+        self.short_token = short_token
         self.size = size
         self.type = comp_type
         self.grade = grade
@@ -51,46 +68,13 @@ def find_sc_installation() -> Optional[Path]:
     return None
 
 
-def extract_from_p4k(p4k_path: Path, filter_pattern: str, output_dir: Path) -> bool:
-    """
-    Extract files from Data.p4k using unp4k.exe
-    """
-    print(f"Extracting from P4K: {filter_pattern}...")
-    
-    # Create output directory
-    output_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Run unp4k.exe
-    cmd = [str(UNP4K_EXE), str(p4k_path), filter_pattern]
-    
-    try:
-        # Change to output directory for extraction
-        original_cwd = os.getcwd()
-        os.chdir(output_dir)
-        
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minutes timeout
-        )
-        
-        os.chdir(original_cwd)
-        
-        if result.returncode != 0:
-            print(f"ERROR: unp4k.exe failed with code {result.returncode}")
-            print(result.stderr)
-            return False
-        
-        print(f"Extraction complete.")
-        return True
-        
-    except subprocess.TimeoutExpired:
-        print("ERROR: Extraction timed out")
-        return False
-    except Exception as e:
-        print(f"ERROR: Extraction failed: {e}")
-        return False
+def p4k_targets(dcb_output: Path, ini_output: Path) -> List[P4kTarget]:
+    """Files the audit needs from Data.p4k, each with its fallback paths."""
+    return [
+        P4kTarget("dcb", ["Data/Game2.dcb", "Data/Game.dcb"], dcb_output, reuse=True),
+        P4kTarget("global.ini", ["Data/Libs/Localization/English/global.ini",
+                                 "Data/Localization/english/global.ini"], ini_output),
+    ]
 
 
 def unforge_dcb(dcb_path: Path) -> bool:
@@ -125,39 +109,18 @@ def unforge_dcb(dcb_path: Path) -> bool:
         return False
 
 
-def parse_global_ini(ini_path: Path) -> Dict[str, str]:
+def parse_global_ini(ini_path: Path) -> Mapping[str, str]:
     """
     Parse global.ini to build name token dictionary.
+    Returns a read-only, memory-mapped view (see ini_index.py); values are
+    only decoded for the keys that are looked up.
     """
     print(f"Parsing localization file: {ini_path.name}...")
     
-    name_dict = {}
-    
     try:
-        # Try multiple encodings
-        for encoding in ['utf-8', 'utf-16', 'latin-1']:
-            try:
-                with open(ini_path, 'r', encoding=encoding) as f:
-                    for line in f:
-                        line = line.strip()
-                        
-                        # Skip comments and empty lines
-                        if not line or line.startswith(';') or line.startswith('#'):
-                            continue
-                        
-                        # Parse key=value
-                        if '=' in line:
-                            key, value = line.split('=', 1)
-                            name_dict[key.strip()] = value.strip()
-                
-                print(f"Loaded {len(name_dict)} localization entries (encoding: {encoding})")
-                return name_dict
-                
-            except UnicodeDecodeError:
-                continue
-        
-        print("ERROR: Could not decode global.ini with any encoding")
-        return {}
+        name_dict = map_ini(ini_path)
+        print(f"Loaded {len(name_dict)} localization entries (encoding: {name_dict.encoding})")
+        return name_dict
         
     except Exception as e:
         print(f"ERROR: Failed to parse global.ini: {e}")
@@ -174,190 +137,419 @@ def resolve_name_token(token: str, name_dict: Dict[str, str]) -> str:
     return name_dict.get(clean_token, token)
 
 
+def build_component(attach_attrs: Dict[str, str], loc_attrs: Dict[str, str]) -> Optional[ComponentData]:
+    """
+    Build a ComponentData from the AttachDef and Localization attributes.
+    Returns None if no naming rule covers the type or a field the rule needs is missing.
+    """
+    # Extract Type and find its rule
+    comp_type = attach_attrs.get("Type")
+    rule = rule_for(comp_type)
+    if rule is None:
+        return None
+        
+    if any(not attach_attrs.get(attr) for attr in rule.required):
+        return None
+        
+    # Extract Size and Grade
+    try:
+        size = int(attach_attrs.get("Size", "0"))
+    except ValueError:
+        return None
+        
+    # Map numeric grade to letter if necessary (1=A, 2=B, 3=C, 4=D)
+    grade_val = attach_attrs.get("Grade", "")
+    grade_map = {"1": "A", "2": "B", "3": "C", "4": "D"}
+    grade = grade_map.get(grade_val, grade_val) # Default to original if not 1-4
+    
+    # Extract Name, Short Name and Description Tokens
+    name_token = loc_attrs.get("Name")
+    if not name_token or not name_token.startswith("@"):
+        return None
+        
+    description_token = loc_attrs.get("Description", "")
+    short_token = loc_attrs.get("ShortName", "") if rule.short_names else ""
+    if not short_token.startswith("@"):
+        short_token = ""
+        
+    # Create ComponentData (Name will be resolved later)
+    return ComponentData("UNRESOLVED", name_token, size, comp_type, grade, description_token, short_token)
+
+
 def extract_component_from_xml(xml_path: Path) -> Optional[ComponentData]:
     """
     Parses a component XML to extract Name, Size, Type, Grade, and Description Token.
+    Streams the file through a pull parser in small blocks and stops as soon as the
+    first AttachDef and its Localization child have been seen; finished elements are
+    cleared on the way, so memory stays bounded on large entity records.
     Returns None if the file is not a valid component or missing critical fields.
     """
     try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
+        parser = ET.XMLPullParser(events=("start", "end"))
+        depth = 0
+        attach_attrs = None
+        attach_depth = 0
         
-        # 1. Find AttachDef (Critical for component stats)
-        # Path: Components -> SAttachableComponentParams -> AttachDef
-        attach_def = root.find(".//AttachDef")
-        if attach_def is None:
-            return None
-            
-        # 2. Extract Type and Filter
-        comp_type = attach_def.get("Type")
-        valid_types = ["Cooler", "PowerPlant", "Shield", "QuantumDrive"]
-        if comp_type not in valid_types:
-            return None
-            
-        # 3. Extract Size and Grade
-        size_str = attach_def.get("Size")
-        grade_val = attach_def.get("Grade")
-        
-        if not size_str or not grade_val:
-            return None
-            
-        try:
-            size = int(size_str)
-        except ValueError:
-            return None
-            
-        # Map numeric grade to letter if necessary (1=A, 2=B, 3=C, 4=D)
-        grade_map = {"1": "A", "2": "B", "3": "C", "4": "D"}
-        grade = grade_map.get(grade_val, grade_val) # Default to original if not 1-4
-        
-        # 4. Extract Name and Description Tokens
         # Path: Components -> SAttachableComponentParams -> AttachDef -> Localization
-        localization = attach_def.find("Localization")
-        if localization is None:
-            return None
-            
-        name_token = localization.get("Name")
-        if not name_token or not name_token.startswith("@"):
-            return None
-            
-        description_token = localization.get("Description", "")
-            
-        # Create ComponentData (Name will be resolved later)
-        return ComponentData("UNRESOLVED", name_token, size, comp_type, grade, description_token)
+        with open(xml_path, "rb") as f:
+            while True:
+                block = f.read(STREAM_BLOCK)
+                if block:
+                    parser.feed(block)
+                else:
+                    parser.close()
+                
+                for event, elem in parser.read_events():
+                    if event == "start":
+                        depth += 1
+                        if attach_attrs is None:
+                            if elem.tag == "AttachDef":
+                                attach_attrs = dict(elem.attrib)
+                                attach_depth = depth
+                                # No rule for this type: no need to read any further
+                                if attach_attrs.get("Type") not in RULES_BY_TYPE:
+                                    return None
+                        elif depth == attach_depth + 1 and elem.tag == "Localization":
+                            return build_component(attach_attrs, elem.attrib)
+                    else:
+                        depth -= 1
+                        if attach_attrs is not None and depth < attach_depth:
+                            # AttachDef closed without a Localization child
+                            return None
+                        elem.clear()
+                
+                if not block:
+                    return None
         
     except Exception as e:
         return None
 
 
-def walk_component_xmls(libs_dir: Path, name_dict: Dict[str, str]) -> List[ComponentData]:
+# scitem subdirectory -> rule name, and file name keywords, from the naming rules
+COMPONENT_DIRS, COMPONENT_FILE_KEYWORDS = manifest_layout()
+SHARD_SIZE = 256  # XML files per worker task
+SCITEM_RECORDS = "entities/scitem/"  # DataCore record paths of the scitem tree
+
+
+def extract_components_batch(xml_paths: List[Path]) -> List[Optional[ComponentData]]:
+    """Worker task: parse a shard of XMLs. Returns one entry per path (None for non-components)."""
+    return [extract_component_from_xml(xml_path) for xml_path in xml_paths]
+
+
+def walk_component_xmls(libs_dir: Path, name_dict: Dict[str, str], workers: int = 1,
+                        use_index: bool = True) -> List[ComponentData]:
     """
     Walk the extracted XML directory and find all components.
+    Results are kept in the persistent component index, so only files that are
+    new or changed since the last walk are parsed (use_index=False parses all).
+    With workers > 1 (None = all cores) those files are sharded across a
+    process pool. Components are returned in sorted path order either way, so
+    the result order is deterministic.
     """
-    components = []
-    
     scitem_root = libs_dir / "foundry" / "records" / "entities" / "scitem"
     
     if not scitem_root.exists():
         print(f"WARNING: scitem directory not found at {scitem_root}")
         return []
     
-    # Walk the entire scitem directory
-    xml_count = 0
-    print(f"Scanning {scitem_root}...")
+    # Candidate files come from the component manifest; the scitem tree is only walked when there is none
+    manifest = load_manifest(libs_dir, scitem_root, COMPONENT_DIRS, COMPONENT_FILE_KEYWORDS)
+    if manifest is None:
+        manifest = write_component_manifest(libs_dir)
+    xml_count = manifest["xml_count"]
+    files = manifest_files(scitem_root, manifest)
     
-    for xml_file in scitem_root.rglob("*.xml"):
-        xml_count += 1
+    index = ComponentIndex(scitem_root, EXTRACTOR_VERSION) if use_index else None
+    try:
+        if index is not None:
+            to_parse, deleted = index.stale(files)
+            index.remove(deleted)
+        else:
+            to_parse, deleted = list(files), []
+        to_parse.sort()
+        
+        print(f"Scanned {xml_count} XML files total, {len(files)} candidates, "
+              f"parsing {len(to_parse)} new or changed ({len(deleted)} removed)...")
+        parsed = parse_component_files(scitem_root, to_parse, workers)
         
-        # Filter by filename patterns to focus on relevant components
-        filename_lower = xml_file.name.lower()
-        if any(keyword in filename_lower for keyword in ['shield', 'power', 'cooler', 'quantum', 'shld', 'powr', 'cool', 'qdrv']):
-            # Call with 1 arg
-            component = extract_component_from_xml(xml_file)
+        if index is not None:
+            index.update(
+                (path, files[path], component_row(component)) for path, component in parsed.items()
+            )
+        
+        components = []
+        for path in sorted(files):
+            if path in parsed:
+                component = parsed[path]
+            else:
+                component = component_from_row(index.get(path))
             if component:
                 components.append(component)
-        
-        # Progress indicator
-        if xml_count % 1000 == 0:
-            print(f"  Processed {xml_count} XML files, found {len(components)} components so far...")
-    
-    print(f"Scanned {xml_count} XML files total")
+    finally:
+        if index is not None:
+            index.close()
+
     return components
 
 
-def audit_language_pack(components: List[ComponentData], language_pack_ini: Path) -> Dict:
+def component_from_record(record) -> Optional[ComponentData]:
+    """
+    Component of an EntityClassDefinition record, from the same AttachDef and
+    Localization fields the XML walker reads. None if it has no AttachDef, its
+    type has no naming rule or a field is missing.
+    """
+    # Path: Components -> SAttachableComponentParams -> AttachDef -> Localization
+    for params in record.instance.get("Components") or []:
+        if params is None or "AttachDef" not in params:
+            continue
+        attach = params["AttachDef"]
+        if attach.get("Type") not in RULES_BY_TYPE:
+            return None
+        # Same string attributes unforge would have written
+        attach_attrs = {name: str(attach[name]) for name in ("Type", "Size", "Grade") if name in attach}
+        localization = attach.get("Localization")
+        loc_attrs = {}
+        if localization is not None:
+            loc_attrs = {name: localization[name] for name in ("Name", "ShortName", "Description") if name in localization}
+        return build_component(attach_attrs, loc_attrs)
+    return None
+
+
+def read_components_from_dcb(dcb_path: Path) -> List[ComponentData]:
+    """
+    Read the components straight from the DataCore, without unforge or XML.
+    Only EntityClassDefinition records under the scitem tree are opened, and
+    only those whose AttachDef type has a naming rule become components, in
+    record path order like the XML walk.
+    Raises DataCoreError if the file layout is not understood.
+    """
+    print(f"Reading components from {dcb_path.name}...")
+    with DataCore(dcb_path) as dcb:
+        records = [r for r in dcb.records("EntityClassDefinition") if SCITEM_RECORDS in r.filename.lower()]
+        records.sort(key=lambda r: r.filename)
+        components = []
+        for record in records:
+            component = component_from_record(record)
+            if component:
+                components.append(component)
+    print(f"Checked {len(records)} scitem entity records (DataCore version {dcb.version})")
+    return components
+
+
+def write_component_manifest(libs_dir: Path) -> Dict:
+    """Build and save the component manifest of an unforged tree (run after each extraction)."""
+    scitem_root = libs_dir / "foundry" / "records" / "entities" / "scitem"
+    print(f"Scanning {scitem_root}...")
+    manifest = build_manifest(libs_dir, scitem_root, COMPONENT_DIRS, COMPONENT_FILE_KEYWORDS)
+    try:
+        write_manifest(libs_dir, manifest)
+    except OSError as e:
+        print(f"Warning: could not write component manifest: {e}")
+    counts = ", ".join(f"{t}: {len(p)}" for t, p in manifest["components"].items())
+    print(f"Component manifest: {counts or 'no components'}")
+    return manifest
+
+
+def parse_component_files(scitem_root: Path, paths: List[str], workers: int = 1) -> Dict[str, Optional[ComponentData]]:
+    """Parse the given files (relative to scitem_root), sharded across a process pool when workers > 1."""
+    shards = [paths[i:i + SHARD_SIZE] for i in range(0, len(paths), SHARD_SIZE)]
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(shards) <= 1:
+        results = map(extract_components_batch, ([scitem_root / p for p in shard] for shard in shards))
+        pool = None
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=min(workers, len(shards)))
+        results = pool.map(extract_components_batch, [[scitem_root / p for p in shard] for shard in shards])
+        print(f"  Using {min(workers, len(shards))} worker processes")
+
+    parsed = {}
+    found = 0
+    try:
+        for i, (shard, shard_components) in enumerate(zip(shards, results), 1):
+            parsed.update(zip(shard, shard_components))
+            found += sum(1 for component in shard_components if component)
+            # Progress indicator
+            if i % 4 == 0 or i == len(shards):
+                print(f"  Parsed {min(i * SHARD_SIZE, len(paths))}/{len(paths)} files, found {found} components so far...")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return parsed
+
+
+def component_row(component: Optional[ComponentData]):
+    """Fields stored in the component index."""
+    if component is None:
+        return None
+    return [component.token, component.size, component.type, component.grade,
+            component.description_token, component.short_token]
+
+
+def component_from_row(row) -> Optional[ComponentData]:
+    if row is None:
+        return None
+    return ComponentData("UNRESOLVED", *row)
+
+
+def audit_language_pack(components: List[ComponentData], language_pack_ini: Path,
+                        lang_pack: Optional[Mapping[str, str]] = None) -> Dict:
     """
     Audit the language pack against extracted component data.
+    Pass an already loaded lang_pack to avoid parsing the file again.
     """
     print(f"\nAuditing language pack: {language_pack_ini}")
     
     # Parse the language pack
-    lang_pack = parse_global_ini(language_pack_ini)
+    if lang_pack is None:
+        lang_pack = parse_global_ini(language_pack_ini)
     
     results = {
         'total_components': len(components),
         'mismatches': [],
         'missing': [],
         'correct': [],
-        'placeholders_ignored': 0
+        'placeholders_ignored': 0,
+        'case_fallbacks': [],
+        'resolved': []  # every token found in the pack, with the value the fixer would write
     }
+    folded_keys = None  # case-folded key index, built on the first miss
     
     for comp in components:
-        # 1. Resolve Description to find Class
-        desc_token = comp.description_token
-        clean_desc_token = desc_token.lstrip('@')
-        description_text = lang_pack.get(clean_desc_token, "")
-        
-        # Extract Class from description (e.g., "Class: Military")
-        # Regex looks for "Class:" followed by whitespace and a word
-        class_match = re.search(r"Class:\s*(\w+)", description_text, re.IGNORECASE)
-        if class_match:
-            comp.item_class = class_match.group(1).capitalize()
-        else:
-            comp.item_class = "Unknown"
-            
-        # 2. Determine Prefix based on Class
-        # Map: Military->M, Civilian->C, Industrial->I, Stealth->S, Competition->R
-        class_prefix_map = {
-            'Military': 'M',
-            'Civilian': 'C',
-            'Industrial': 'I',
-            'Stealth': 'S',
-            'Competition': 'R', 
-        }
-        
-        type_prefix = class_prefix_map.get(comp.item_class, 'C')
+        rule = rule_for(comp.type)
         
-        # 3. Resolve Name
-        clean_name_token = comp.token.lstrip('@')
-        actual_name = lang_pack.get(clean_name_token)
+        # 1. Resolve Description to find Class (e.g., "Class: Military")
+        resolve_class(comp, lang_pack)
         
-        # Case-insensitive fallback for name lookup
-        if not actual_name:
-            for k, v in lang_pack.items():
-                if k.lower() == clean_name_token.lower():
-                    actual_name = v
-                    clean_name_token = k
-                    break
+        # 2. Generate the Expected Code from the rule template
+        # e.g. [Prefix][Size][Grade] for components, S[Size] for weapons
+        expected_code = rule.code(comp)
         
-        # 4. Filter Placeholders
-        if actual_name and ("PLACEHOLDER" in actual_name or "LOC_PLACEHOLDER" in actual_name):
-            results['placeholders_ignored'] += 1
-            continue
+        for token in rule.tokens(comp):
+            # 3. Resolve Name
+            clean_name_token = token.lstrip('@')
+            actual_name = lang_pack.get(clean_name_token)
             
-        if not actual_name:
-            results['missing'].append({
-                'component': comp.token,
-                'expected': f"{type_prefix}{comp.size}{comp.grade} ...",
-                'description_class': comp.item_class
-            })
-            continue
-
-        # 5. Generate Expected Name
-        # Format: [Prefix][Size][Grade] [Name]
-        expected_code = f"{type_prefix}{comp.size}{comp.grade}"
-        
-        # Check if the actual name starts with the code
-        if actual_name.startswith(expected_code):
-             results['correct'].append({
-                'component': comp.token,
+            # Case-insensitive fallback for name lookup (token casing drifts between game data and ini)
+            if not actual_name:
+                if folded_keys is None:
+                    folded_keys = casefold_keys(lang_pack)
+                folded_key = folded_keys.get(clean_name_token.casefold())
+                if folded_key is not None:
+                    actual_name = lang_pack[folded_key]
+                    if actual_name and folded_key != clean_name_token:
+                        results['case_fallbacks'].append({'component': token, 'key': folded_key})
+                    clean_name_token = folded_key
+            
+            # 4. Filter Placeholders
+            if actual_name and ("PLACEHOLDER" in actual_name or "LOC_PLACEHOLDER" in actual_name):
+                results['placeholders_ignored'] += 1
+                continue
+                
+            if not actual_name:
+                results['missing'].append({
+                    'component': token,
+                    'expected': rule.expected(expected_code),
+                    'description_class': comp.item_class
+                })
+                continue
+            
+            results['resolved'].append({
+                'component': token,
+                'key': clean_name_token,
+                'rule': rule.name,
                 'expected': expected_code,
                 'actual': actual_name,
-                'key': clean_name_token
-            })
-        else:
-            # It's a mismatch
-            results['mismatches'].append({
-                'component': comp.token,
-                'expected': f"{expected_code} ...",
-                'actual': actual_name,
-                'key': clean_name_token,
-                'detected_class': comp.item_class
+                'fix': rule.apply(actual_name.strip(), expected_code)
             })
+            
+            # 5. Check if the actual name carries the code
+            if rule.has_code(actual_name, expected_code):
+                 results['correct'].append({
+                    'component': token,
+                    'expected': expected_code,
+                    'actual': actual_name,
+                    'key': clean_name_token
+                })
+            else:
+                # It's a mismatch
+                results['mismatches'].append({
+                    'component': token,
+                    'expected': rule.expected(expected_code),
+                    'actual': actual_name,
+                    'key': clean_name_token,
+                    'detected_class': comp.item_class
+                })
     
     return results
 
 
+def ini_stamp(ini_path: Path, buffer) -> Dict:
+    """Size, mtime and content hash (of its loaded buffer) of an ini file, to tell whether audit results still apply."""
+    stat = os.stat(ini_path)
+    return {
+        'path': str(Path(ini_path).resolve()),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'digest': file_digest(buffer).hex(),
+    }
+
+
+def write_audit_results(results: Dict, ini_path: Path, lang_pack: Mapping[str, str], path: Path = AUDIT_RESULTS):
+    """
+    Save the audit outcome for apply_fixes: the resolved tokens with their expected
+    codes and fixed values, plus each key's line and value span in the ini.
+    """
+    indexed = isinstance(lang_pack, IniIndex)
+    line_map = lang_pack.line_numbers() if indexed else {}
+    resolved = []
+    for item in results['resolved']:
+        entry = dict(item)
+        if line_map:
+            entry['line'] = line_map[entry['key']]
+            entry['offset'], entry['length'] = lang_pack.span(entry['key'])
+        resolved.append(entry)
+
+    artifact = {
+        'version': AUDIT_RESULTS_VERSION,
+        'ini': ini_stamp(ini_path, lang_pack.buffer if indexed else Path(ini_path).read_bytes()),
+        'total_components': results['total_components'],
+        'placeholders_ignored': results['placeholders_ignored'],
+        'resolved': resolved,
+    }
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_audit_results(ini_path: Path, lang_pack: IniIndex, path: Path = AUDIT_RESULTS) -> Optional[Dict]:
+    """
+    Load saved audit results if they were made for this exact ini file
+    (same path and content, hashed from the already loaded lang_pack); returns None otherwise.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if artifact.get('version') != AUDIT_RESULTS_VERSION:
+        return None
+
+    stored = artifact['ini']
+    ini_path = Path(ini_path)
+    stat = os.stat(ini_path)
+    if stored['path'] != str(ini_path.resolve()) or stored['size'] != stat.st_size:
+        return None
+    if stored['mtime_ns'] != stat.st_mtime_ns and stored['digest'] != file_digest(lang_pack.buffer).hex():
+        return None
+    return artifact
+
+
 def print_audit_report(results: Dict):
     """Print a formatted audit report."""
     print("\n" + "=" * 60)
@@ -369,6 +561,7 @@ def print_audit_report(results: Dict):
     print(f"Mismatches: {len(results['mismatches'])}")
     print(f"Missing from Language Pack: {len(results['missing'])}")
     print(f"Placeholders Ignored: {results['placeholders_ignored']}")
+    print(f"Resolved via Case-Insensitive Fallback: {len(results['case_fallbacks'])}")
     
     if results['mismatches']:
         print("\n" + "-" * 60)
@@ -387,6 +580,13 @@ def print_audit_report(results: Dict):
         print("-" * 60)
         for item in results['missing'][:20]:
             print(f"  {item['component']} -> {item['expected']}")
+    
+    if results['case_fallbacks']:
+        print("\n" + "-" * 60)
+        print("TOKEN CASING DRIFT (First 20):")
+        print("-" * 60)
+        for item in results['case_fallbacks'][:20]:
+            print(f"  {item['component']} -> {item['key']}")
 
 
 def parse_version(name):
@@ -436,15 +636,29 @@ def find_target_env(version_dir):
 
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Star Citizen Language Pack Auditor')
+    parser.add_argument('--workers', type=int, default=None, help='processes for XML parsing (default: all cores, 1 = serial)')
+    parser.add_argument('--no-index', action='store_true', help='ignore the component index and parse every XML again')
+    parser.add_argument('--p4k', default=None, help='archive to extract from (default: Data.p4k of the SC installation)')
+    parser.add_argument('--unp4k', default=None, help='extraction command to use instead of tools/unp4k.exe (e.g. a stand-in script)')
+    parser.add_argument('--no-native', action='store_true', help='always extract with unp4k instead of reading Data.p4k directly')
+    parser.add_argument('--unforge', action='store_true', help='convert the DCB to XML with unforge and parse the XMLs instead of reading it directly')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Star Citizen Language Pack Auditor (Native Extraction)")
     print("=" * 60)
     
     # 1. Find SC installation
-    sc_path = find_sc_installation()
-    if not sc_path:
-        return 1
-    p4k_file = sc_path / "Data.p4k"
+    if args.p4k:
+        p4k_file = Path(args.p4k)
+        sc_path = p4k_file.parent
+    else:
+        sc_path = find_sc_installation()
+        if not sc_path:
+            return 1
+        p4k_file = sc_path / "Data.p4k"
 
     ROOT = os.getcwd()
     version_dir = find_ini_versions(ROOT, 'new')
@@ -459,48 +673,41 @@ def main():
    
     extract_dir = REPO_ROOT / "extracted"
     
-    # 2. Extract Game2.dcb (changed from Game.dcb for 4.4.0+)
-    print(f"\n[Phase 1] Extracting Game2.dcb to {extract_dir}...")
+    # 2-3. Extract Game2.dcb (changed from Game.dcb for 4.4.0+) and global.ini in one stage
+    print(f"\n[Phase 1-2] Extracting Game2.dcb and global.ini to {extract_dir}...")
     dcb_output = extract_dir / "dcb"
-    dcb_path = dcb_output / "Data" / "Game2.dcb"
-    
-    if dcb_path.exists():
-        print(f"Game2.dcb already exists at {dcb_path}, skipping extraction.")
-    else:
-        if not extract_from_p4k(p4k_file, "Data/Game2.dcb", dcb_output):
-            print("Trying Game.dcb instead...")
-            if not extract_from_p4k(p4k_file, "Data/Game.dcb", dcb_output):
-                return 1
-    
-    # 3. Extract global.ini
-    print("\n[Phase 2] Extracting global.ini...")
     ini_output = extract_dir / "localization"
     
-    # Try primary path first
-    if not extract_from_p4k(p4k_file, "Data/Libs/Localization/English/global.ini", ini_output):
-        # Fallback: try alternate path
-        print("Trying alternate path...")
-        if not extract_from_p4k(p4k_file, "Data/Localization/english/global.ini", ini_output):
-            print("WARNING: Could not extract global.ini")
-    
-    # 4. Convert Game2.dcb to XML
-    print("\n[Phase 3] Converting DCB to XML...")
-    dcb_file = dcb_output / "Data" / "Game2.dcb"
-    if not dcb_file.exists():
-        # Try alternate filename
-        dcb_file = dcb_output / "Data" / "Game.dcb"
-        if not dcb_file.exists():
-            print(f"ERROR: Neither Game2.dcb nor Game.dcb found in {dcb_output / 'Data'}")
-            return 1
+    tool = shlex.split(args.unp4k) if args.unp4k else [str(UNP4K_EXE)]
+    extracted = extract_targets(p4k_file, p4k_targets(dcb_output, ini_output), tool, native=not args.no_native)
+    if extracted["dcb"] is None:
+        print(f"ERROR: Neither Game2.dcb nor Game.dcb could be extracted from {p4k_file}")
+        return 1
+    if extracted["global.ini"] is None:
+        print("WARNING: Could not extract global.ini")
     
-    # Check if we already have extracted XMLs
+    # 4. Read the components from Game2.dcb, or convert it to XML when that is not possible
+    dcb_file = extracted["dcb"]
     libs_dir = dcb_output / "Data" / "libs"
-    if libs_dir.exists() and any(libs_dir.iterdir()):
-        print(f"Found existing extracted data in {libs_dir}")
-        print("Skipping unforge step...")
-    else:
-        if not unforge_dcb(dcb_file):
-            return 1
+    components = None
+    if not args.unforge:
+        print("\n[Phase 3] Reading DataCore...")
+        try:
+            components = read_components_from_dcb(dcb_file)
+        except (OSError, DataCoreError) as e:
+            print(f"WARNING: Could not read {dcb_file.name} directly ({e}), converting it to XML instead")
+    
+    if components is None:
+        print("\n[Phase 3] Converting DCB to XML...")
+        # Check if we already have extracted XMLs
+        if libs_dir.exists() and any(libs_dir.iterdir()):
+            print(f"Found existing extracted data in {libs_dir}")
+            print("Skipping unforge step...")
+        else:
+            if not unforge_dcb(dcb_file):
+                return 1
+            # Index the fresh tree once so the component walk can skip listing it
+            write_component_manifest(libs_dir)
     
 
     # 5. Use language pack global.ini for name resolution
@@ -521,10 +728,10 @@ def main():
         print("ERROR: Failed to parse language pack")
         return 1
     
-    # 6. Parse component XMLs
-    print("\n[Phase 5] Parsing component XMLs...")
-    libs_dir = dcb_output / "Data" / "libs"
-    components = walk_component_xmls(libs_dir, name_dict)
+    # 6. Parse component XMLs (only when the DataCore could not be read directly)
+    if components is None:
+        print("\n[Phase 5] Parsing component XMLs...")
+        components = walk_component_xmls(libs_dir, name_dict, args.workers, not args.no_index)
     
     print(f"\nFound {len(components)} relevant components!")
     
@@ -533,7 +740,8 @@ def main():
     
     # We're auditing the same file we used for name resolution
     # This checks if the names are in the correct compact format
-    audit_results = audit_language_pack(components, lang_pack_path)
+    audit_results = audit_language_pack(components, lang_pack_path, name_dict)
+    write_audit_results(audit_results, lang_pack_path, name_dict)
     
     # Write report to file
     report_path = Path("final_audit_report.txt")
@@ -552,6 +760,7 @@ def main():
         log(f"Mismatches: {len(results['mismatches'])}")
         log(f"Missing from Language Pack: {len(results['missing'])}")
         log(f"Placeholders Ignored: {results['placeholders_ignored']}")
+        log(f"Resolved via Case-Insensitive Fallback: {len(results['case_fallbacks'])}")
         
         if results['mismatches']:
             log("\n" + "-" * 60)
@@ -570,8 +779,16 @@ def main():
             log("-" * 60)
             for item in results['missing'][:20]:
                 log(f"  {item['component']} -> {item['expected']}")
+        
+        if results['case_fallbacks']:
+            log("\n" + "-" * 60)
+            log("TOKEN CASING DRIFT (First 20):")
+            log("-" * 60)
+            for item in results['case_fallbacks'][:20]:
+                log(f"  {item['component']} -> {item['key']}")
                 
     print(f"Report written to {report_path.absolute()}")
+    print(f"Results for apply_fixes.py written to {AUDIT_RESULTS.absolute()}")
     
     print("\n" + "=" * 60)
     print("Audit complete!")
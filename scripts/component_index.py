@@ -0,0 +1,214 @@
+"""
+Persistent index of parsed component XMLs.
+
+Every candidate file under an unforged scitem tree gets one row keyed by its
+path relative to that tree, together with the size and mtime it had when it
+was parsed and the extracted fields as JSON (NULL for files that turned out
+not to be components). A later walk only re-parses files whose size or mtime
+changed and drops rows for files that are gone, so an audit over unchanged
+data skips XML parsing entirely.
+
+The index is invalidated whenever the extractor version changes.
+
+The component manifest lists the candidate files of an unforged tree by
+component type (from the scitem directory layout). It is written once per
+extraction, so later walks go straight to those files instead of listing the
+whole scitem tree.
+"""
+
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INDEX_DB = Path.cwd() / ".cache" / "components" / "index.sqlite3"
+MANIFEST_NAME = "component_manifest.json"  # written next to the unforged libs/ folder
+MANIFEST_VERSION = 1
+
+SCHEMA_VERSION = 2
+
+# Extracted fields of a component (stored as JSON), None for other files
+Row = Optional[list]
+
+
+class ComponentIndex:
+    """Component rows for one scitem root, backed by SQLite."""
+    def __init__(self, scitem_root: Path, extractor_version: int, db_path: Path = INDEX_DB):
+        self.root = str(Path(scitem_root).resolve())
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS files")
+            self.db.execute("DROP TABLE IF EXISTS roots")
+            self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " root TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL,"
+            " fields TEXT, PRIMARY KEY (root, path)) WITHOUT ROWID"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS roots ("
+            " root TEXT PRIMARY KEY, extractor_version INTEGER NOT NULL) WITHOUT ROWID"
+        )
+
+        stored = self.db.execute("SELECT extractor_version FROM roots WHERE root = ?", (self.root,)).fetchone()
+        if stored is None or stored[0] != extractor_version:
+            # Extraction rules changed: everything has to be parsed again
+            self.db.execute("DELETE FROM files WHERE root = ?", (self.root,))
+            self.db.execute("INSERT OR REPLACE INTO roots VALUES (?, ?)", (self.root, extractor_version))
+
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._rows: Dict[str, Row] = {}
+        for path, size, mtime_ns, fields in self.db.execute(
+            "SELECT path, size, mtime_ns, fields FROM files WHERE root = ?", (self.root,)
+        ):
+            self._stamps[path] = (size, mtime_ns)
+            self._rows[path] = json.loads(fields) if fields is not None else None
+
+    def __len__(self) -> int:
+        return len(self._stamps)
+
+    def stale(self, files: Dict[str, Tuple[int, int]]) -> Tuple[List[str], List[str]]:
+        """
+        Compare the current files (relative path -> (size, mtime_ns)) to the index.
+        Returns (paths to re-parse, indexed paths that no longer exist).
+        """
+        changed = [path for path, stamp in files.items() if self._stamps.get(path) != stamp]
+        deleted = [path for path in self._stamps if path not in files]
+        return changed, deleted
+
+    def get(self, path: str) -> Row:
+        return self._rows.get(path)
+
+    def update(self, entries: Iterable[Tuple[str, Tuple[int, int], Row]]):
+        """Store freshly parsed (path, (size, mtime_ns), row) entries."""
+        records = []
+        for path, stamp, row in entries:
+            self._stamps[path] = stamp
+            self._rows[path] = row
+            records.append((self.root, path, *stamp, json.dumps(row) if row is not None else None))
+        self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", records)
+
+    def remove(self, paths: Iterable[str]):
+        """Drop entries for deleted files."""
+        paths = list(paths)
+        for path in paths:
+            self._stamps.pop(path, None)
+            self._rows.pop(path, None)
+        self.db.executemany("DELETE FROM files WHERE root = ? AND path = ?", ((self.root, p) for p in paths))
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def tree_stamp(libs_dir: Path, scitem_root: Path) -> Dict[str, List[int]]:
+    """
+    Cheap fingerprint of an unforged tree: the source .dcb and the scitem root
+    directory (size, mtime_ns). A new unforge run changes both.
+    """
+    stamp = {}
+    for path in (libs_dir.parent / "Game2.dcb", libs_dir.parent / "Game.dcb", scitem_root):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stamp[path.name] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+
+def dir_type_for(rel_dir: str, type_dirs: Dict[str, str]) -> Optional[str]:
+    """Type of a directory ("ships/weapons/", relative to scitem) whose path ends with a type_dirs key."""
+    rel_dir = "/" + rel_dir.lower()
+    for directory, dir_type in type_dirs.items():
+        if rel_dir.endswith(f"/{directory}/"):
+            return dir_type
+    return None
+
+
+def build_manifest(libs_dir: Path, scitem_root: Path, type_dirs: Dict[str, str], keywords: Iterable[str]) -> Dict:
+    """
+    List the component files of a scitem tree by type.
+    A file belongs to the type of its nearest parent directory matching type_dirs
+    (e.g. ships/cooler/ -> ship_component, ships/weapons/ -> ship_weapon); other XMLs whose file name contains one of the
+    keywords are listed under "Other". Paths are relative posix paths.
+    """
+    keywords = tuple(keywords)
+    components: Dict[str, List[str]] = {}
+    xml_count = 0
+    stack = [(str(scitem_root), "", None)]
+    while stack:
+        directory, prefix, dir_type = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir():
+                    sub_prefix = prefix + entry.name + "/"
+                    sub_type = dir_type_for(sub_prefix, type_dirs) or dir_type
+                    stack.append((entry.path, sub_prefix, sub_type))
+                    continue
+                name = entry.name.lower()
+                if not name.endswith(".xml"):
+                    continue
+                xml_count += 1
+                if dir_type is not None:
+                    components.setdefault(dir_type, []).append(prefix + entry.name)
+                elif any(keyword in name for keyword in keywords):
+                    components.setdefault("Other", []).append(prefix + entry.name)
+
+    return {
+        "version": MANIFEST_VERSION,
+        "stamp": tree_stamp(libs_dir, scitem_root),
+        "layout": {"dirs": dict(sorted(type_dirs.items())), "keywords": sorted(keywords)},
+        "xml_count": xml_count,
+        "components": {comp_type: sorted(paths) for comp_type, paths in sorted(components.items())},
+    }
+
+
+def manifest_path(libs_dir: Path) -> Path:
+    return libs_dir.parent / MANIFEST_NAME
+
+
+def write_manifest(libs_dir: Path, manifest: Dict):
+    path = manifest_path(libs_dir)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def load_manifest(libs_dir: Path, scitem_root: Path, type_dirs: Dict[str, str], keywords: Iterable[str]) -> Optional[Dict]:
+    """
+    The stored manifest, or None if there is none, the tree was extracted again
+    since, or it was built for a different directory/keyword layout.
+    """
+    try:
+        with open(manifest_path(libs_dir), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("stamp") != tree_stamp(libs_dir, scitem_root):
+        return None
+    if manifest.get("layout") != {"dirs": dict(sorted(type_dirs.items())), "keywords": sorted(keywords)}:
+        return None
+    return manifest
+
+
+def manifest_files(scitem_root: Path, manifest: Dict) -> Dict[str, Tuple[int, int]]:
+    """Stat the files listed in a manifest: relative path -> (size, mtime_ns). Missing files are skipped."""
+    files = {}
+    root = str(scitem_root)
+    for paths in manifest["components"].values():
+        for path in paths:
+            try:
+                stat = os.stat(os.path.join(root, path))
+            except OSError:
+                continue
+            files[path] = (stat.st_size, stat.st_mtime_ns)
+    return files
@@ -1,11 +1,19 @@
 import os
-import re
+import json
+import hashlib
+import time
 from pathlib import Path
 import shutil
 
+from ini_index import IniIndex, load_ini, sniff_encoding
+
 # YOU MAY NEED TO CHANGE THIS
 SC_INSTALL_PATH = r"C:\Program Files\Roberts Space Industries\StarCitizen"
 
+WRITE_BUFFER = 1 << 20  # 1 MiB output buffer for streaming merges
+MANIFEST_NAME = "global.ini.manifest.json"  # written next to the deployed global.ini
+POLL_INTERVAL = 0.05  # seconds between target_strings.ini checks in --watch mode
+
 
 def parse_version(name):
     parts = name.split(".")
@@ -51,41 +59,296 @@ def find_target_env(root, flag):
         return ptu
     raise Exception("Neither LIVE nor PTU exists inside version folder.")
 
-def parse_ini_lines(lines):
-    data = {}
-    for line in lines:
-        m = re.match(r'^(.*?)=(.*)$', line)
-        if m:
-            key = m.group(1).strip()
-            val = m.group(2)
-            data[key] = val
-    return data
-
-def merge_ini(global_lines, modified_data):
-    output = []
+def iter_merged(global_lines, modified_data):
+    """Yield merged lines one at a time; unseen keys are appended at the end."""
     seen = set()
 
     for line in global_lines:
-        m = re.match(r'^(.*?)(=)(.*)$', line)
-        if m:
-            key = m.group(1).strip()
-            prefix = line[: line.index("=") + 1]
+        # Split on the first '=' (same as the old ^(.*?)=(.*)$ match, without the regex)
+        raw_key, sep, _ = line.partition("=")
+        if sep:
+            key = raw_key.strip()
             if key in modified_data:
-                output.append(f"{prefix}{modified_data[key]}")
+                yield f"{raw_key}={modified_data[key]}"
                 seen.add(key)
             else:
-                output.append(line)
+                yield line
         else:
-            output.append(line)
+            yield line
 
     # Add new keys that didn't exist
     for key, val in modified_data.items():
         if key not in seen:
-            output.append(f"{key}={val}")
+            yield f"{key}={val}"
+
+def merge_ini(global_lines, modified_data):
+    return list(iter_merged(global_lines, modified_data))
+
+def merge_ini_stream(src_path, dst_path, modified_data, encoding="utf-8"):
+    """
+    Merge src into dst in a single pass without holding either file in memory.
+    Output is identical to "\n".join(merge_ini(...)). Returns the number of lines written.
+    """
+    count = 0
+    with open(src_path, "r", encoding=encoding, errors="replace") as src, \
+         open(dst_path, "w", encoding=encoding, buffering=WRITE_BUFFER) as dst:
+        lines = (line.rstrip("\n") for line in src)
+        for line in iter_merged(lines, modified_data):
+            dst.write(f"\n{line}" if count else line)
+            count += 1
+    return count
+
+def merge_digest(src_path, modified_data, encoding="utf-8"):
+    """
+    Hash the source and the merged output in one read-only pass.
+    Returns (source_digest, merged_digest); equal digests mean the merge changes nothing.
+    """
+    src_hash = hashlib.sha256()
+    out_hash = hashlib.sha256()
+
+    def source_lines(f):
+        for i, line in enumerate(f):
+            line = line.rstrip("\n")
+            src_hash.update((f"\n{line}" if i else line).encode("utf-8"))
+            yield line
+
+    with open(src_path, "r", encoding=encoding, errors="replace") as src:
+        for i, line in enumerate(iter_merged(source_lines(src), modified_data)):
+            out_hash.update((f"\n{line}" if i else line).encode("utf-8"))
+
+    return src_hash.hexdigest(), out_hash.hexdigest()
+
+def read_manifest(dest_dir):
+    try:
+        with open(Path(dest_dir) / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def is_deployed(dest_file, manifest, digest):
+    """True if dest_file is still the exact file we deployed for this digest."""
+    try:
+        stat = os.stat(dest_file)
+    except OSError:
+        return False
+    return (manifest.get("sha256") == digest
+            and manifest.get("size") == stat.st_size
+            and manifest.get("mtime_ns") == stat.st_mtime_ns)
+
+def deploy_file(src_path, dest_file, digest):
+    """Copy atomically (temp file + rename) and record the content hash in the manifest."""
+    dest_file = Path(dest_file)
+    tmp_file = dest_file.with_name(dest_file.name + ".tmp")
+    shutil.copy2(src_path, tmp_file)
+    os.replace(tmp_file, dest_file)
+
+    stat = os.stat(dest_file)
+    manifest = {"sha256": digest, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    tmp_manifest = dest_file.with_name(MANIFEST_NAME + ".tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, dest_file.with_name(MANIFEST_NAME))
+
+def build_and_deploy(global_ini, modified_data, dest_dir):
+    """
+    Merge modified_data into global_ini and push it to dest_dir.
+    Unchanged output skips both the rewrite and the copy. Returns True if anything was written.
+    """
+    encoding = sniff_encoding(global_ini)
+    src_digest, out_digest = merge_digest(global_ini, modified_data, encoding)
+    changed = False
+
+    if out_digest != src_digest:
+        # Overwrite global.ini (streamed through a temp file, then swapped in)
+        tmp_ini = global_ini + ".tmp"
+        merge_ini_stream(global_ini, tmp_ini, modified_data, encoding)
+        os.replace(tmp_ini, global_ini)
+        print(f"Updated: {global_ini}")
+        changed = True
+    else:
+        print(f"Unchanged: {global_ini}")
+
+    dest_dir = Path(dest_dir)
+    dest_file = dest_dir / "global.ini"
+    if is_deployed(dest_file, read_manifest(dest_dir), out_digest):
+        print(f"Already deployed, skipping copy: {dest_file}")
+        return changed
+
+    print("Pushing to game directory...")
+    try:
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        deploy_file(global_ini, dest_file, out_digest)
+        print(f"Success! Deployed to: {dest_file}")
+        changed = True
+    except Exception as e:
+        print(f"Error deploying file: {e}")
+    return changed
+
+class LiveMerge:
+    """
+    Keeps global.ini indexed in memory and re-renders it from a set of overrides.
+    The file is split into byte pieces around each overridden value, so an edit
+    only replaces the pieces of the keys that changed. The rendered text is the
+    same as "\n".join(merge_ini(...)) on the original file.
+    """
+    def __init__(self, source: IniIndex):
+        self.source = source
+        self.overrides = {}
+        self._pieces = []
+        self._slots = {}  # key -> indexes of its value pieces (one per line of the key)
+
+    def update(self, modified_data):
+        """Apply a new set of overrides; returns the keys whose value changed."""
+        changed = [k for k, v in modified_data.items() if self.overrides.get(k) != v]
+        changed += [k for k in self.overrides if k not in modified_data]
+        if not changed:
+            return changed
+
+        self.overrides = dict(modified_data)
+        inline_keys = {k for k in modified_data if k in self.source}
+        if inline_keys != set(self._slots):
+            # Override added/removed for a key in the file: re-split around the new set
+            self._layout(inline_keys)
+        else:
+            for key in changed:
+                for slot in self._slots.get(key, ()):
+                    self._pieces[slot] = self._encode(self.overrides[key])
+        return changed
 
-    return output
+    def _encode(self, value):
+        return value.encode(self.source.encoding, errors="replace")
+
+    def _layout(self, keys):
+        buf = self.source.buffer
+        encoding = self.source.encoding
+        # Every line of an overridden key is replaced, duplicates included, like iter_merged
+        spans = []
+        pos = self.source.data_start
+        for line in buf[pos:].split(b"\n"):
+            raw_key, sep, _ = line.partition(b"=")
+            if sep:
+                key = raw_key.decode(encoding, errors="replace").strip()
+                if key in keys:
+                    # Overrides replace everything after '=' up to the line ending
+                    end = pos + len(line) - (1 if line.endswith(b"\r") else 0)
+                    spans.append((pos + len(raw_key) + 1, end, key))
+            pos += len(line) + 1
+
+        pieces = []
+        slots = {}
+        pos = self.source.data_start
+        for start, end, key in spans:
+            pieces.append(buf[pos:start])
+            slots.setdefault(key, []).append(len(pieces))
+            pieces.append(self._encode(self.overrides[key]))
+            pos = end
+        tail = buf[pos:]
+        # Reading line by line and joining with "\n" drops one trailing newline
+        if tail.endswith(b"\n"):
+            tail = tail[:-2] if tail.endswith(b"\r\n") else tail[:-1]
+        pieces.append(tail)
+
+        self._pieces = pieces
+        self._slots = slots
+
+    def render_text(self):
+        text = b"".join(self._pieces).decode(self.source.encoding, errors="replace")
+        if "\r" in text:
+            text = text.replace("\r\n", "\n")
+        appended = [f"{k}={v}" for k, v in self.overrides.items() if k not in self.source]
+        if appended:
+            text = "\n".join([text] + appended) if text else "\n".join(appended)
+        return text
+
+def write_and_deploy(live, global_ini, dest_dir):
+    """Write the live merge to global_ini and the game directory (atomic, hash-checked)."""
+    text = live.render_text()
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    tmp_ini = global_ini + ".tmp"
+    with open(tmp_ini, "w", encoding=live.source.output_encoding, buffering=WRITE_BUFFER) as f:
+        f.write(text)
+    os.replace(tmp_ini, global_ini)
+
+    dest_dir = Path(dest_dir)
+    dest_file = dest_dir / "global.ini"
+    if not is_deployed(dest_file, read_manifest(dest_dir), digest):
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        deploy_file(global_ini, dest_file, digest)
+
+def sync_overrides(live, modified_ini, global_ini, dest_dir):
+    """
+    Re-read target_strings.ini into live and write/deploy the result.
+    Returns the keys that changed. If writing fails, live is rolled back so the
+    next attempt sees the same keys as changed again.
+    """
+    overrides = dict(load_ini(modified_ini, use_cache=False).items())
+    previous = dict(live.overrides)
+    changed = live.update(overrides)
+    if changed:
+        try:
+            write_and_deploy(live, global_ini, dest_dir)
+        except Exception:
+            live.update(previous)
+            raise
+    return changed
+
+def file_stamp(path):
+    """(size, mtime_ns) of a file, or None if it cannot be read right now."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def watch(global_ini, modified_ini, dest_dir):
+    """
+    Re-merge and redeploy every time target_strings.ini is saved.
+    global.ini is parsed once; each save only re-applies the override keys that changed.
+    A save that fails to apply is retried on every poll until it goes through.
+    """
+    last_stamp = file_stamp(modified_ini)
+    build_and_deploy(global_ini, dict(load_ini(modified_ini).items()), dest_dir)
+
+    # The merged file is the base from here on; overrides are re-applied on top of it
+    live = LiveMerge(load_ini(global_ini))
+    live.update(dict(load_ini(modified_ini).items()))
+
+    retry = False
+    print(f"Watching {modified_ini} (Ctrl+C to stop)...")
+    try:
+        while True:
+            stamp = file_stamp(modified_ini)
+            if stamp is None or (stamp == last_stamp and not retry):
+                time.sleep(POLL_INTERVAL)
+                continue
+            last_stamp = stamp
+
+            start = time.perf_counter()
+            try:
+                changed = sync_overrides(live, modified_ini, global_ini, dest_dir)
+            except Exception as e:
+                # e.g. the editor still holds the file or the game locks global.ini
+                print(f"Error applying changes: {e}, retrying")
+                retry = True
+                time.sleep(POLL_INTERVAL)
+                continue
+            retry = False
+            if not changed:
+                continue
+
+            elapsed = (time.perf_counter() - start) * 1000
+            shown = ", ".join(changed[:5]) + (" ..." if len(changed) > 5 else "")
+            print(f"Deployed {len(changed)} change(s) in {elapsed:.0f} ms: {shown}")
+    except KeyboardInterrupt:
+        print("Stopped watching.")
 
 def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Merge target_strings.ini into global.ini and deploy it")
+    parser.add_argument("--watch", action="store_true", help="keep running and redeploy whenever target_strings.ini is saved")
+    args = parser.parse_args()
+
     # C:\users\user\scLanguagePack
     ROOT = os.getcwd()
 
@@ -99,35 +362,18 @@ def main():
     if not (os.path.isfile(global_ini) and os.path.isfile(modified_ini)):
         raise Exception("global.ini or target_strings.ini not found.")
 
-    with open(global_ini, "r", encoding="utf-8") as f:
-        global_lines = [line.rstrip("\n") for line in f]
-
-    with open(modified_ini, "r", encoding="utf-8") as f:
-        modified_lines = [line.rstrip("\n") for line in f]
-
-    modified_data = parse_ini_lines(modified_lines)
-
-    merged = merge_ini(global_lines, modified_data)
-
-    # Overwrite global.ini
-    with open(global_ini, "w", encoding="utf-8") as f:
-        f.write("\n".join(merged))
-
-    print(f"Updated: {global_ini}")
     print(f"Source:  {modified_ini}")
-    print("Pushing to game directory...")
 
     game_dir = find_target_env(SC_INSTALL_PATH, False)
     dest_dir = Path(game_dir) / "data" / "Localization" / "english"
     print(dest_dir)
-    dest_path = dest_dir
 
-    try:
-        dest_dir.mkdir(parents=True, exist_ok=True)  
-        shutil.copy2(global_ini, dest_path)
-        print(f"Success! Deployed to: {dest_path}")
-    except Exception as e:
-        print(f"Error deploying file: {e}")
+    if args.watch:
+        watch(global_ini, modified_ini, dest_dir)
+        return
+
+    modified_data = dict(load_ini(modified_ini).items())
+    build_and_deploy(global_ini, modified_data, dest_dir)
 
 
 if __name__ == "__main__":
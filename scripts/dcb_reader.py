@@ -0,0 +1,362 @@
+"""
+Pure-Python reader for DataCore files (Game.dcb / Game2.dcb).
+
+A .dcb is a header of table sizes followed by the type tables (structures,
+properties, enums, data mappings), the record table, one array per value type
+(targets of array properties), the string tables and finally the instance
+data: for every data mapping, a run of fixed-size instances of one structure.
+Everything is located from the header alone, so opening a file only reads the
+definition tables; instances are decoded on access, which lets a caller look
+at the records of one structure and pull a few properties out of each
+without converting the whole database (what unforge.exe does, into tens of
+thousands of XML files).
+
+From version 6 on, definition and record names live in a second string
+table; string values, locale keys, enum values and file names stay in the
+first.
+
+A damaged file raises DataCoreError, both when it is opened and when a record
+walk runs off its tables.
+"""
+
+import functools
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+HEADER = struct.Struct("<IIHHHH5I19III")
+STRUCT_DEF = struct.Struct("<IIHHI")      # name, parent, property count, first property, node type
+PROPERTY_DEF = struct.Struct("<IHHHH")    # name, structure/enum index, data type, conversion type, padding
+ENUM_DEF = struct.Struct("<IHH")          # name, value count, first value
+DATA_MAPPING = struct.Struct("<II")       # structure count, structure index
+RECORD = struct.Struct("<III16sHH")       # name, file name, structure, id, instance, structure size
+ARRAY_POINTER = struct.Struct("<II")      # count, first index
+
+NO_INDEX = 0xFFFFFFFF
+MIN_VERSION = 5  # 32-bit data mappings
+TWO_STRING_TABLES = 6
+
+# Data types
+BOOLEAN, INT8, INT16, INT32, INT64 = 0x01, 0x02, 0x03, 0x04, 0x05
+UINT8, UINT16, UINT32, UINT64 = 0x06, 0x07, 0x08, 0x09
+STRING, FLOAT, DOUBLE, LOCALE, GUID, ENUM_CHOICE = 0x0A, 0x0B, 0x0C, 0x0D, 0x0E, 0x0F
+CLASS, STRONG_POINTER, WEAK_POINTER, REFERENCE = 0x10, 0x110, 0x210, 0x310
+
+ATTRIBUTE = 0  # conversion type of inline values; anything else is an array
+
+# Value arrays in file order: data type -> (struct format, header count slot)
+# Header count slots follow the order boolean, int8 ... uint64, float, double,
+# guid, string, locale, enum, strong, weak, reference, enum value name.
+VALUE_ARRAYS = [
+    (INT8, "b", 1), (INT16, "h", 2), (INT32, "i", 3), (INT64, "q", 4),
+    (UINT8, "B", 5), (UINT16, "H", 6), (UINT32, "I", 7), (UINT64, "Q", 8),
+    (BOOLEAN, "?", 0), (FLOAT, "f", 9), (DOUBLE, "d", 10), (GUID, "16s", 11),
+    (STRING, "I", 12), (LOCALE, "I", 13), (ENUM_CHOICE, "I", 14),
+    (STRONG_POINTER, "II", 15), (WEAK_POINTER, "II", 16), (REFERENCE, "I16s", 17),
+    (None, "I", 18),  # enum value names
+]
+
+
+class DataCoreError(Exception):
+    """The file is not a DataCore layout this reader understands."""
+
+
+# What a walk over damaged tables runs into: reads past the buffer, indexes
+# past a table, undecodable names, reference cycles
+LAYOUT_ERRORS = (struct.error, IndexError, UnicodeDecodeError, RecursionError)
+
+
+def _checked(method):
+    """Report LAYOUT_ERRORS from a DataCore accessor as DataCoreError."""
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        try:
+            return method(self, *args)
+        except LAYOUT_ERRORS as e:
+            raise DataCoreError(f"{self.path.name}: corrupt table data ({type(e).__name__}: {e})") from e
+    return wrapper
+
+
+def _guid(raw: bytes) -> str:
+    c, b, a, k, j, i, h, g, f, e, d = struct.unpack("<HHI8B", raw)
+    return f"{a:08x}-{b:04x}-{c:04x}-{d:02x}{e:02x}-{f:02x}{g:02x}{h:02x}{i:02x}{j:02x}{k:02x}"
+
+
+class Instance:
+    """One structure instance; properties are decoded on access (instance["Size"])."""
+    __slots__ = ("dcb", "struct_index", "offset")
+
+    def __init__(self, dcb: "DataCore", struct_index: int, offset: int):
+        self.dcb = dcb
+        self.struct_index = struct_index
+        self.offset = offset
+
+    @property
+    def type(self) -> str:
+        return self.dcb.struct_name(self.struct_index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.dcb.layout(self.struct_index)
+
+    def __getitem__(self, name: str):
+        offset, prop = self.dcb.layout(self.struct_index)[name]
+        return self.dcb.read_property(self.offset + offset, prop)
+
+    def get(self, name: str, default=None):
+        return self[name] if name in self else default
+
+    def __repr__(self):
+        return f"Instance({self.type}, Offset={self.offset})"
+
+
+class DataCoreRecord:
+    """One record table entry."""
+    __slots__ = ("dcb", "name_offset", "filename_offset", "struct_index", "id", "instance_index")
+
+    def __init__(self, dcb, name_offset, filename_offset, struct_index, raw_id, instance_index):
+        self.dcb = dcb
+        self.name_offset = name_offset
+        self.filename_offset = filename_offset
+        self.struct_index = struct_index
+        self.id = raw_id
+        self.instance_index = instance_index
+
+    @property
+    def name(self) -> str:
+        return self.dcb.name(self.name_offset)
+
+    @property
+    def filename(self) -> str:
+        return self.dcb.string(self.filename_offset)
+
+    @property
+    def guid(self) -> str:
+        return _guid(self.id)
+
+    @property
+    def instance(self) -> Instance:
+        return self.dcb.instance(self.struct_index, self.instance_index)
+
+    def __repr__(self):
+        return f"DataCoreRecord({self.name}, Type={self.dcb.struct_name(self.struct_index)})"
+
+
+class DataCore:
+    """Memory-mapped DataCore with lazily decoded instances."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise DataCoreError(f"{self.path} is empty")
+        self._layouts: Dict[int, Dict[str, Tuple[int, tuple]]] = {}
+        self._sizes: Dict[int, int] = {}
+        self._strings: Dict[Tuple[int, int], str] = {}
+        try:
+            self._read_tables()
+        except LAYOUT_ERRORS as e:
+            self.close()
+            raise DataCoreError(f"{self.path.name}: truncated or unknown layout ({e})")
+        except DataCoreError:
+            self.close()
+            raise
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read_tables(self):
+        buf = self._map
+        header = HEADER.unpack_from(buf, 0)
+        self.version = header[1]
+        if self.version < MIN_VERSION:
+            raise DataCoreError(f"{self.path.name}: DataCore version {self.version} is not supported")
+        struct_count, property_count, enum_count, mapping_count, record_count = header[6:11]
+        value_counts = header[11:30]
+        text_length, text_length2 = header[30], header[31]
+        if self.version < TWO_STRING_TABLES:
+            text_length2 = 0
+
+        pos = HEADER.size
+        self.structs = list(STRUCT_DEF.iter_unpack(buf[pos:pos + struct_count * STRUCT_DEF.size]))
+        pos += struct_count * STRUCT_DEF.size
+        self.properties = list(PROPERTY_DEF.iter_unpack(buf[pos:pos + property_count * PROPERTY_DEF.size]))
+        pos += property_count * PROPERTY_DEF.size
+        self.enums = list(ENUM_DEF.iter_unpack(buf[pos:pos + enum_count * ENUM_DEF.size]))
+        pos += enum_count * ENUM_DEF.size
+        mappings = list(DATA_MAPPING.iter_unpack(buf[pos:pos + mapping_count * DATA_MAPPING.size]))
+        pos += mapping_count * DATA_MAPPING.size
+        self.records_offset, self.record_count = pos, record_count
+        pos += record_count * RECORD.size
+
+        # Value arrays: data type -> (offset, item struct)
+        self.values: Dict[int, Tuple[int, struct.Struct]] = {}
+        for data_type, fmt, slot in VALUE_ARRAYS:
+            item = struct.Struct("<" + fmt)
+            if data_type is not None:
+                self.values[data_type] = (pos, item)
+            pos += value_counts[slot] * item.size
+
+        self.text_offset, self.text_end = pos, pos + text_length
+        pos += text_length
+        if text_length2:
+            self.names_offset, self.names_end = pos, pos + text_length2
+            pos += text_length2
+        else:
+            self.names_offset, self.names_end = self.text_offset, self.text_end
+
+        # Instance data: structure -> [(first instance offset, count)], in mapping order
+        self.instances: Dict[int, List[Tuple[int, int]]] = {}
+        for count, struct_index in mappings:
+            self.instances.setdefault(struct_index, []).append((pos, count))
+            pos += count * self.struct_size(struct_index)
+        if pos != len(buf):
+            raise DataCoreError(f"{self.path.name}: table sizes do not add up "
+                                f"({pos} != {len(buf)} bytes, version {self.version})")
+
+    @_checked
+    def _read_string(self, start: int, end: int, offset: int) -> str:
+        key = (start, offset)
+        value = self._strings.get(key)
+        if value is None:
+            pos = start + offset
+            if not start <= pos < end:
+                return ""
+            stop = self._map.find(b"\0", pos, end)
+            value = self._map[pos:stop if stop >= 0 else end].decode("utf-8", errors="replace")
+            self._strings[key] = value
+        return value
+
+    def string(self, offset: int) -> str:
+        """String value, locale key, enum value or file name."""
+        return self._read_string(self.text_offset, self.text_end, offset)
+
+    def name(self, offset: int) -> str:
+        """Structure, property, enum or record name."""
+        return self._read_string(self.names_offset, self.names_end, offset)
+
+    @_checked
+    def struct_name(self, struct_index: int) -> str:
+        return self.name(self.structs[struct_index][0])
+
+    def struct_index(self, name: str) -> Optional[int]:
+        for index, definition in enumerate(self.structs):
+            if self.name(definition[0]) == name:
+                return index
+        return None
+
+    @_checked
+    def struct_properties(self, struct_index: int) -> List[tuple]:
+        """Property definitions of a structure, inherited ones first."""
+        chain = []
+        while struct_index != NO_INDEX:
+            if len(chain) > len(self.structs):
+                raise DataCoreError(f"{self.path.name}: structure {chain[0]} inherits from itself")
+            chain.append(struct_index)
+            struct_index = self.structs[struct_index][1]
+        props = []
+        for index in reversed(chain):
+            _, _, count, first, _ = self.structs[index]
+            props.extend(self.properties[first:first + count])
+        return props
+
+    @_checked
+    def struct_size(self, struct_index: int) -> int:
+        size = self._sizes.get(struct_index)
+        if size is None:
+            size = sum(self._property_size(prop) for prop in self.struct_properties(struct_index))
+            self._sizes[struct_index] = size
+        return size
+
+    def _property_size(self, prop: tuple) -> int:
+        _, index, data_type, conversion, _ = prop
+        if conversion != ATTRIBUTE:
+            return ARRAY_POINTER.size
+        if data_type == CLASS:
+            return self.struct_size(index)
+        if data_type not in self.values:
+            raise DataCoreError(f"{self.path.name}: unknown data type {data_type:#x}")
+        return self.values[data_type][1].size
+
+    @_checked
+    def layout(self, struct_index: int) -> Dict[str, Tuple[int, tuple]]:
+        """Property name -> (offset inside an instance, property definition)."""
+        layout = self._layouts.get(struct_index)
+        if layout is None:
+            layout = {}
+            offset = 0
+            for prop in self.struct_properties(struct_index):
+                layout.setdefault(self.name(prop[0]), (offset, prop))
+                offset += self._property_size(prop)
+            self._layouts[struct_index] = layout
+        return layout
+
+    @_checked
+    def instance(self, struct_index: int, instance_index: int) -> Instance:
+        for start, count in self.instances.get(struct_index, ()):
+            if instance_index < count:
+                return Instance(self, struct_index, start + instance_index * self.struct_size(struct_index))
+            instance_index -= count
+        raise DataCoreError(f"{self.path.name}: {self.struct_name(struct_index)} has no instance {instance_index}")
+
+    def records(self, struct_name: Optional[str] = None) -> Iterator[DataCoreRecord]:
+        """Records in file order, optionally only those of one structure (names are not decoded for the rest)."""
+        wanted = None
+        if struct_name is not None:
+            wanted = self.struct_index(struct_name)
+            if wanted is None:
+                return
+        table = self._map[self.records_offset:self.records_offset + self.record_count * RECORD.size]
+        if len(table) != self.record_count * RECORD.size:
+            raise DataCoreError(f"{self.path.name}: record table runs past the end of the file")
+        for fields in RECORD.iter_unpack(table):
+            if wanted is None or fields[2] == wanted:
+                yield DataCoreRecord(self, *fields[:5])
+
+    def _pointer(self, struct_index: int, instance_index: int) -> Optional[Instance]:
+        if struct_index == NO_INDEX or instance_index == NO_INDEX:
+            return None
+        return self.instance(struct_index, instance_index)
+
+    def _scalar(self, data_type: int, values: tuple):
+        if data_type in (STRING, LOCALE, ENUM_CHOICE):
+            return self.string(values[0])
+        if data_type in (STRONG_POINTER, WEAK_POINTER):
+            return self._pointer(*values)
+        if data_type == GUID:
+            return _guid(values[0])
+        if data_type == REFERENCE:
+            return _guid(values[1])  # referenced record id
+        return values[0]
+
+    @_checked
+    def read_property(self, offset: int, prop: tuple):
+        """
+        Decode the property stored at offset: scalars as Python values, strings
+        and enums as str, references as record GUIDs, classes and pointers as
+        Instances (None for null pointers) and arrays as lists.
+        """
+        _, index, data_type, conversion, _ = prop
+        if data_type != CLASS and data_type not in self.values:
+            raise DataCoreError(f"{self.path.name}: unknown data type {data_type:#x}")
+        if conversion == ATTRIBUTE:
+            if data_type == CLASS:
+                return Instance(self, index, offset)
+            item = self.values[data_type][1]
+            return self._scalar(data_type, item.unpack_from(self._map, offset))
+
+        count, first = ARRAY_POINTER.unpack_from(self._map, offset)
+        if data_type == CLASS:
+            return [self.instance(index, first + i) for i in range(count)]
+        start, item = self.values[data_type]
+        return [self._scalar(data_type, item.unpack_from(self._map, start + (first + i) * item.size))
+                for i in range(count)]
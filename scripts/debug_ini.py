@@ -1,17 +1,16 @@
 
 import os
 
+from ini_index import load_ini
+
 file_path = r"c:\Github\ScCompLangPackRemix\4.4.0\PTU\data\Localization\english\global.ini"
 
 print(f"Reading {file_path}...")
 
 try:
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-except UnicodeDecodeError:
-    print("UTF-8 failed, trying utf-16")
-    with open(file_path, 'r', encoding='utf-16') as f:
-        lines = f.readlines()
+    ini = load_ini(file_path)
+    lines = ini.lines()
+    print(f"Encoding: {ini.encoding}")
 except Exception as e:
     print(f"Error reading file: {e}")
     exit(1)
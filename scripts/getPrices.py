@@ -1,9 +1,305 @@
 import json
-import requests
 import re
 import os
+import time
+import difflib
+import sqlite3
+import unicodedata
+from pathlib import Path
 
-def set_commodity_price():
+from target_strings import TargetStrings
+
+try:
+    import requests
+except ImportError:
+    requests = None  # only needed when fetching; --offline works without it
+
+API_BASE = "https://api.uexcorp.space/2.0/"
+COMMODITIES_ENDPOINT = "commodities/"  # the only endpoint whose data is written to the ini
+SNAPSHOT_DIR = Path.cwd() / ".cache" / "prices"
+DEFAULT_TTL = 6 * 60 * 60  # seconds a snapshot is served without asking the API
+KEEP_SNAPSHOTS = 30        # timestamped snapshots kept per endpoint
+REQUEST_TIMEOUT = 30
+HISTORY_DB = SNAPSHOT_DIR / "history.sqlite3"
+STATISTICS = ("latest", "median", "mean", "min", "max")
+DEFAULT_STAT = "median"
+DEFAULT_WINDOW_DAYS = 7
+RETRIES = 3
+
+FUZZY_CUTOFF = 0.85  # difflib ratio needed for a last-resort name match
+FUZZY_MARGIN = 0.05  # how far the runner-up must trail for a fuzzy match to count
+
+
+def normalize_name(name):
+    """Case-fold and collapse whitespace/punctuation: "E'tam" -> "e tam"."""
+    name = unicodedata.normalize("NFKC", name).casefold()
+    return " ".join(re.sub(r"[^\w]+", " ", name).split())
+
+
+def compact_name(name):
+    """Normalized name without spaces: "Gasping Weevil-Eggs" -> "gaspingweevileggs"."""
+    return normalize_name(name).replace(" ", "")
+
+
+def name_variant(name):
+    """Trailing "(Raw)"/"(Ore)" style qualifier, normalized; "" if there is none."""
+    variant = re.search(r"\(([^)]*)\)\s*$", name)
+    return normalize_name(variant.group(1)) if variant else ""
+
+
+def build_price_index(values):
+    """
+    Build the name lookup tables once for a list of {"name", ...} price entries.
+    A compact form shared by several entries is ambiguous and left out.
+    """
+    exact = {}
+    normalized = {}
+    compact = {}
+    for item in values:
+        exact.setdefault(item["name"].casefold(), item)
+        normalized.setdefault(normalize_name(item["name"]), item)
+        compact.setdefault(compact_name(item["name"]), []).append(item)
+
+    compact = {key: items[0] for key, items in compact.items() if len(items) == 1}
+    return {
+        "exact": exact,
+        "normalized": normalized,
+        "compact": compact,
+        "variants": {key: name_variant(item["name"]) for key, item in compact.items()},
+        "fuzzy": {},  # memoised fuzzy results
+    }
+
+
+def fuzzy_match(index, name):
+    """
+    Closest compact name with the same qualifier (so "Quantainium (Raw)" never
+    resolves to refined "Quantainium"). Only a clear winner is accepted: at least
+    FUZZY_CUTOFF, with the runner-up trailing by FUZZY_MARGIN.
+    """
+    variant = name_variant(name)
+    matcher = difflib.SequenceMatcher()
+    matcher.set_seq2(compact_name(name))
+    scored = []
+    for key, key_variant in index["variants"].items():
+        if key_variant != variant:
+            continue
+        matcher.set_seq1(key)
+        if (matcher.real_quick_ratio() >= FUZZY_CUTOFF - FUZZY_MARGIN
+                and matcher.quick_ratio() >= FUZZY_CUTOFF - FUZZY_MARGIN):
+            scored.append((matcher.ratio(), key))
+    scored.sort(reverse=True)
+
+    if not scored or scored[0][0] < FUZZY_CUTOFF:
+        return None
+    if len(scored) > 1 and scored[0][0] - scored[1][0] < FUZZY_MARGIN:
+        return None
+    return index["compact"][scored[0][1]]
+
+
+def find_price(index, name):
+    """Look up a price entry by display name: exact, normalized, compact, then fuzzy."""
+    match = index["exact"].get(name.casefold())
+    if match:
+        return match
+
+    match = index["normalized"].get(normalize_name(name))
+    if match:
+        return match
+
+    key = compact_name(name)
+    match = index["compact"].get(key)
+    if match or not key:
+        return match
+
+    normalized = normalize_name(name)
+    if normalized not in index["fuzzy"]:
+        index["fuzzy"][normalized] = fuzzy_match(index, name)
+    return index["fuzzy"][normalized]
+
+
+def price_values(data):
+    """Normalise a commodities response to [{"name", "price", "illegal"}]."""
+    lst = (
+        data if isinstance(data, list)
+        else data.get("data") or data.get("commodities") or []
+    )
+    return [
+        {
+            "name": item["name"],
+            "price": item.get("price_sell"),
+            "illegal": bool(item.get("is_illegal"))
+        }
+        for item in lst
+    ]
+
+
+def open_history():
+    """
+    Open the price history database, creating it on first use.
+    A new database is backfilled from the commodities snapshots already on disk.
+    """
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(HISTORY_DB)
+    created = not db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prices'"
+    ).fetchone()
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS prices ("
+        " name TEXT NOT NULL, fetched_at REAL NOT NULL, price REAL NOT NULL,"
+        " PRIMARY KEY (name, fetched_at)) WITHOUT ROWID"
+    )
+    if created:
+        for path in snapshot_paths("commodities"):
+            snapshot = load_snapshot(path)
+            record_prices(db, price_values(snapshot["data"]), snapshot["fetched_at"])
+    return db
+
+
+def record_prices(db, values, fetched_at):
+    """Append one fetch to the history (re-recording the same fetch is a no-op)."""
+    with db:
+        db.executemany(
+            "INSERT OR IGNORE INTO prices (name, fetched_at, price) VALUES (?, ?, ?)",
+            [(v["name"], fetched_at, v["price"]) for v in values if v["price"] is not None],
+        )
+
+
+def price_statistics(db, stat=DEFAULT_STAT, window_days=DEFAULT_WINDOW_DAYS, now=None):
+    """
+    Aggregate the history over the last window_days, in one set-based query per statistic.
+    Returns {name: price}.
+    """
+    since = (now or time.time()) - window_days * 24 * 60 * 60
+    queries = {
+        "latest": (
+            "SELECT p.name, p.price FROM prices p"
+            " JOIN (SELECT name, MAX(fetched_at) AS t FROM prices GROUP BY name) last"
+            " ON p.name = last.name AND p.fetched_at = last.t"
+        ),
+        "mean": "SELECT name, AVG(price) FROM prices WHERE fetched_at >= ? GROUP BY name",
+        "min": "SELECT name, MIN(price) FROM prices WHERE fetched_at >= ? GROUP BY name",
+        "max": "SELECT name, MAX(price) FROM prices WHERE fetched_at >= ? GROUP BY name",
+        "median": (
+            "SELECT name, AVG(price) FROM ("
+            " SELECT name, price,"
+            "  ROW_NUMBER() OVER (PARTITION BY name ORDER BY price) AS rn,"
+            "  COUNT(*) OVER (PARTITION BY name) AS cnt"
+            " FROM prices WHERE fetched_at >= ?)"
+            " WHERE rn IN ((cnt + 1) / 2, (cnt + 2) / 2) GROUP BY name"
+        ),
+    }
+    params = () if stat == "latest" else (since,)
+    return dict(db.execute(queries[stat], params).fetchall())
+
+
+def display_price(value):
+    """Stored prices are floats; show whole numbers like the API does."""
+    return int(round(value)) if value >= 10 else round(value, 2)
+
+
+def snapshot_paths(name):
+    """Snapshots for an endpoint, oldest first (file names sort by timestamp)."""
+    return sorted(SNAPSHOT_DIR.glob(f"{name}-*.json"))
+
+
+def load_snapshot(path):
+    with open(path, "r", encoding="utf8") as f:
+        return json.load(f)
+
+
+def latest_snapshot(name):
+    paths = snapshot_paths(name)
+    return (paths[-1], load_snapshot(paths[-1])) if paths else (None, None)
+
+
+def write_snapshot(path, snapshot):
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def save_snapshot(name, url, data, etag=None, last_modified=None):
+    """Store a new timestamped snapshot and prune old ones."""
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    now = time.time()
+    stamp = time.strftime("%Y%m%dT%H%M%SZ", time.gmtime(now))
+    snapshot = {
+        "url": url,
+        "fetched_at": now,
+        "validated_at": now,
+        "etag": etag,
+        "last_modified": last_modified,
+        "data": data,
+    }
+    write_snapshot(SNAPSHOT_DIR / f"{name}-{stamp}.json", snapshot)
+
+    if name == "commodities":
+        db = open_history()
+        try:
+            record_prices(db, price_values(data), now)
+        finally:
+            db.close()
+
+    for old in snapshot_paths(name)[:-KEEP_SNAPSHOTS]:
+        old.unlink(missing_ok=True)
+    return snapshot
+
+
+def fetch_json(name, url, ttl=DEFAULT_TTL, offline=False):
+    """
+    Return the JSON for an endpoint, going through the snapshot store.
+    Snapshots younger than ttl are used as is; older ones are revalidated with
+    If-None-Match/If-Modified-Since. Offline (or on network failure) the latest
+    snapshot is used regardless of age.
+    """
+    path, snapshot = latest_snapshot(name)
+
+    if offline:
+        if snapshot is None:
+            raise RuntimeError(f"offline mode: no {name} snapshot in {SNAPSHOT_DIR}")
+        print(f"Offline: using {path.name}")
+        return snapshot["data"]
+
+    if snapshot is not None and time.time() - snapshot["validated_at"] < ttl:
+        print(f"Using cached {name} from {path.name}")
+        return snapshot["data"]
+
+    if requests is None:
+        raise RuntimeError("the requests package is required to fetch prices (or use --offline)")
+
+    headers = {}
+    if snapshot is not None:
+        if snapshot.get("etag"):
+            headers["If-None-Match"] = snapshot["etag"]
+        if snapshot.get("last_modified"):
+            headers["If-Modified-Since"] = snapshot["last_modified"]
+
+    for attempt in range(RETRIES):
+        try:
+            response = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+            if response.status_code == 304 and snapshot is not None:
+                print(f"{name} not modified, keeping {path.name}")
+                snapshot["validated_at"] = time.time()
+                write_snapshot(path, snapshot)
+                return snapshot["data"]
+            response.raise_for_status()
+            data = response.json()
+            save_snapshot(name, url, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            print(f"Fetched {name}.")
+            return data
+        except Exception as err:
+            if attempt + 1 < RETRIES:
+                print(f"Fetch failed ({err}), retrying...")
+                time.sleep(2 ** attempt)
+            elif snapshot is not None:
+                print(f"Fetch failed ({err}), falling back to {path.name}")
+                return snapshot["data"]
+            else:
+                raise
+
+
+def set_commodity_price(ttl=DEFAULT_TTL, offline=False, api_base=API_BASE, stat=DEFAULT_STAT, window_days=DEFAULT_WINDOW_DAYS):
     try:
         script_dir = os.getcwd()
         ini_path = os.path.join(script_dir, "target_strings.ini")
@@ -12,40 +308,27 @@ def set_commodity_price():
             print("INI file not found.")
             return
 
-        response = requests.get("https://api.uexcorp.space/2.0/commodities/")
-        data = response.json()
-        print("Fetched commodities.")
-
-        lst = (
-            data if isinstance(data, list)
-            else data.get("data") or data.get("commodities") or []
-        )
-
-        values = [
-            {
-                "name": item["name"],
-                "price": item.get("price_sell"),
-                "illegal": bool(item.get("is_illegal"))
-            }
-            for item in lst
-        ]
+        data = fetch_json("commodities", api_base + COMMODITIES_ENDPOINT, ttl, offline)
+        values = price_values(data)
 
-        with open(ini_path, "r", encoding="utf8") as f:
-            modified = f.read()
+        # Displayed price comes from the history so one noisy snapshot doesn't end up in the pack
+        db = open_history()
+        try:
+            stats = price_statistics(db, stat, window_days)
+        finally:
+            db.close()
+        print(f"Using {stat} price over the last {window_days} day(s) ({len(stats)} commodities in history)")
+        for item in values:
+            if item["name"] in stats:
+                item["price"] = display_price(stats[item["name"]])
 
-        start_marker = ";commodities start"
-        end_marker = ";commodities end"
-        start = modified.find(start_marker)
-        end = modified.find(end_marker)
-
-        if start == -1 or end == -1:
+        doc = TargetStrings.load(ini_path)
+        try:
+            entries = doc.section("commodities")
+        except KeyError:
             print("No commodities section found.")
             return
 
-        before = modified[: start + len(start_marker)]
-        section = modified[start + len(start_marker) : end].strip()
-        after = modified[end :]
-
         def format_price(num):
             if num >= 100_000:
                 return f"{float(f'{num/1000:.4g}')}k"
@@ -55,38 +338,58 @@ def set_commodity_price():
                 return f"{float(f'{num/1000:.2g}')}k"
             return str(num)
 
-        updated_lines = []
-        for line in section.split("\n"):
-            if not line.strip() or "=" not in line:
-                updated_lines.append(line)
-                continue
+        price_index = build_price_index(values)
 
-            key, value = line.split("=", 1)
-            commodity_name = value.strip()
+        for entry in entries:
+            commodity_name = entry.value.strip()
             commodity_name = re.sub(r"^\[\!\]", "", commodity_name)
             commodity_name = re.sub(r"\s+\d+(\.\d+)?.?/SCU$", "", commodity_name).strip()
 
-            match = next(
-                (c for c in values if c["name"].lower() == commodity_name.lower()),
-                None
-            )
+            match = find_price(price_index, commodity_name)
+
+            if match and match["name"].casefold() != commodity_name.casefold():
+                print(f"  {commodity_name}: using the price of {match['name']}")
 
             if match:
-                formatted = f"{match['name']} {format_price(match['price'])}/SCU"
+                # The ini keeps its own display name; only the price comes from UEX
+                formatted = f"{commodity_name} {format_price(match['price'])}/SCU"
                 if match["illegal"]:
                     formatted = "[!] " + formatted
-                updated_lines.append(f"{key}={formatted}")
+                entry.set(formatted)
             else:
-                updated_lines.append(f"{key}={commodity_name}")
-
-        new_file = before + "\n" + "\n".join(updated_lines) + "\n" + after
+                entry.set(commodity_name)
 
-        with open(ini_path, "w", encoding="utf8") as f:
-            f.write(new_file)
+        # Only the edited lines are re-rendered; nothing is written if no price moved
+        if not doc.save():
+            print("Prices unchanged.")
+            return
 
         print("Update complete.")
 
     except Exception as err:
         print("Error:", err)
 
-set_commodity_price()
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Update commodity prices in target_strings.ini from UEX")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL, help="seconds a stored price snapshot stays fresh")
+    parser.add_argument("--offline", action="store_true", help="never touch the network, use the latest stored snapshot")
+    parser.add_argument("--refresh", action="store_true", help="ignore the TTL and revalidate with the API")
+    parser.add_argument("--api-base", default=API_BASE, help="API root URL (e.g. a local stub server)")
+    parser.add_argument("--stat", default=DEFAULT_STAT, choices=STATISTICS, help="price shown in the pack")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW_DAYS, help="days of history the statistic covers")
+    args = parser.parse_args()
+
+    set_commodity_price(
+        ttl=0 if args.refresh else args.ttl,
+        offline=args.offline,
+        api_base=args.api_base,
+        stat=args.stat,
+        window_days=args.window,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Persistent cache of parsed ini indexes.
+
+Each ini file gets one binary entry in .cache/ini/ holding its key index
+(keys + value offsets/lengths). Entries are keyed on file size, mtime and a
+content hash, so unchanged files skip the line scan entirely. Only the
+newest KEEP_VERSIONS game versions are kept.
+
+Layout: HEADER | offsets (uint32[count]) | lengths (uint32[count]) | keys (utf-8, '\\n' separated)
+"""
+
+import hashlib
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CACHE_DIR = Path.cwd() / ".cache" / "ini"
+KEEP_VERSIONS = 3
+
+MAGIC = b"SCINIDX2"  # bumped whenever the index layout or value spans change
+# magic, size, mtime_ns, digest, count, keys length, bom length, encoding, version
+HEADER = struct.Struct("<8sQq16sIIB15s16s")
+
+
+def file_digest(buffer) -> bytes:
+    """Content hash of an ini buffer (bytes or mmap)."""
+    return hashlib.blake2b(buffer, digest_size=16).digest()
+
+
+def parse_version(name):
+    parts = name.split(".")
+    try:
+        return tuple(int(p) for p in parts)
+    except:
+        return None
+
+
+def version_of(ini_path: Path) -> str:
+    """Game version folder an ini file belongs to (e.g. '4.5.0'), or '' if none."""
+    for part in reversed(Path(ini_path).resolve().parts):
+        if parse_version(part):
+            return part
+    return ""
+
+
+def cache_path(ini_path: Path) -> Path:
+    name = hashlib.blake2b(str(Path(ini_path).resolve()).encode("utf-8"), digest_size=8).hexdigest()
+    return CACHE_DIR / f"{name}.idx"
+
+
+def _write_atomic(path: Path, data: bytes):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def lookup(ini_path: Path, stat: os.stat_result, buffer) -> Optional[Tuple[str, int, List[str], array, array]]:
+    """
+    Return (encoding, bom_length, keys, offsets, lengths) for an unchanged file,
+    or None if there is no valid cache entry.
+    """
+    path = cache_path(ini_path)
+    try:
+        raw = path.read_bytes()
+    except OSError:
+        return None
+    if len(raw) < HEADER.size:
+        return None
+
+    magic, size, mtime_ns, digest, count, keys_length, bom_length, encoding, version = HEADER.unpack_from(raw)
+    if magic != MAGIC or size != stat.st_size:
+        return None
+
+    if mtime_ns != stat.st_mtime_ns:
+        # Touched but maybe not changed (e.g. re-extracted): fall back to the content hash
+        if file_digest(buffer) != digest:
+            return None
+        header = HEADER.pack(magic, size, stat.st_mtime_ns, digest, count, keys_length, bom_length, encoding, version)
+        try:
+            _write_atomic(path, header + raw[HEADER.size:])
+        except OSError:
+            pass
+
+    offsets = array("I")
+    lengths = array("I")
+    pos = HEADER.size
+    width = count * offsets.itemsize
+    offsets.frombytes(raw[pos:pos + width])
+    lengths.frombytes(raw[pos + width:pos + 2 * width])
+    pos += 2 * width
+
+    keys = raw[pos:pos + keys_length].decode("utf-8").split("\n") if count else []
+    if len(keys) != count or len(offsets) != count or len(lengths) != count:
+        return None
+
+    return encoding.rstrip(b"\0").decode("ascii"), bom_length, keys, offsets, lengths
+
+
+def store(ini_path: Path, stat: os.stat_result, buffer, encoding: str, bom_length: int,
+          keys: List[str], offsets: array, lengths: array):
+    """Write the index of an ini file to the cache and evict old versions."""
+    keys_blob = "\n".join(keys).encode("utf-8")
+    header = HEADER.pack(
+        MAGIC, stat.st_size, stat.st_mtime_ns, file_digest(buffer), len(keys), len(keys_blob),
+        bom_length, encoding.encode("ascii"), version_of(ini_path).encode("ascii"),
+    )
+    try:
+        _write_atomic(cache_path(ini_path), header + offsets.tobytes() + lengths.tobytes() + keys_blob)
+        evict()
+    except OSError as e:
+        print(f"Warning: could not write ini cache: {e}")
+
+
+def evict(keep_versions: int = KEEP_VERSIONS):
+    """Drop cache entries for all but the newest keep_versions game versions."""
+    if not CACHE_DIR.is_dir():
+        return
+
+    entries = []
+    for path in CACHE_DIR.glob("*.idx"):
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+            version = HEADER.unpack(header)[-1].rstrip(b"\0").decode("ascii")
+        except (OSError, struct.error, UnicodeDecodeError):
+            # Unreadable entry, just drop it
+            path.unlink(missing_ok=True)
+            continue
+        entries.append((version, path))
+
+    versions = sorted({v for v, _ in entries if v}, key=parse_version, reverse=True)
+    keep = set(versions[:keep_versions])
+    for version, path in entries:
+        # Files outside a version folder (e.g. target_strings.ini) are always kept
+        if version and version not in keep:
+            path.unlink(missing_ok=True)
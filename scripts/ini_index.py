@@ -0,0 +1,355 @@
+"""
+Shared global.ini loader.
+
+Reads an ini file once as bytes, detects the BOM/encoding up front and builds
+an ordered key -> (offset, length) index over that single buffer. Values are
+only decoded when they are looked up, so every script can share one parse.
+"""
+
+import codecs
+import mmap
+import os
+from array import array
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import ini_cache
+
+BOM_UTF8 = b"\xef\xbb\xbf"
+BOM_UTF16_LE = b"\xff\xfe"
+BOM_UTF16_BE = b"\xfe\xff"
+
+# Bytes scanned per pass while building the index
+SCAN_CHUNK = 1 << 20
+
+# Loaded files for this process, keyed by path -> ((size, mtime_ns), IniIndex)
+_loaded: Dict[str, Tuple[Tuple[int, int], "IniIndex"]] = {}
+
+
+def detect_encoding(data: bytes) -> Tuple[str, int]:
+    """
+    Detect the encoding of an ini buffer.
+    Returns (encoding, bom_length).
+    """
+    head = data[:3]
+    if head.startswith(BOM_UTF8):
+        return "utf-8", len(BOM_UTF8)
+    if head.startswith(BOM_UTF16_LE):
+        return "utf-16-le", len(BOM_UTF16_LE)
+    if head.startswith(BOM_UTF16_BE):
+        return "utf-16-be", len(BOM_UTF16_BE)
+
+    # Decode in chunks so a mapped file is never decoded in one piece. A file is
+    # only treated as latin-1 when invalid sequences outnumber valid non-ASCII
+    # characters; a mostly UTF-8 file with a stray byte stays UTF-8 (read with
+    # errors="replace", like the scripts always did).
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    valid = invalid = 0
+    for pos in range(0, len(data), SCAN_CHUNK):
+        chunk = data[pos:pos + SCAN_CHUNK]
+        if chunk.isascii() and not decoder.getstate()[0]:
+            continue
+        text = decoder.decode(chunk)
+        replaced = text.count("\ufffd")
+        invalid += replaced
+        valid += len(text) - len(text.encode("ascii", "ignore")) - replaced
+    invalid += decoder.decode(b"", final=True).count("\ufffd")
+    if invalid > valid:
+        return "latin-1", 0
+    return "utf-8", 0
+
+
+def sniff_encoding(ini_path: Path) -> str:
+    """Text encoding for streaming an ini file line by line, from its BOM (defaults to UTF-8)."""
+    with open(ini_path, "rb") as f:
+        head = f.read(3)
+    if head.startswith(BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((BOM_UTF16_LE, BOM_UTF16_BE)):
+        return "utf-16"
+    return "utf-8"
+
+
+def _strip_span(value: bytes, encoding: str) -> Tuple[int, int]:
+    """
+    (leading bytes, length) of value once stripped like str.strip().
+    bytes.strip() only knows ASCII whitespace, so values whose edges are not plain
+    printable ASCII (e.g. a trailing U+00A0) are decoded to strip the rest.
+    """
+    stripped = value.strip()
+    lead = len(value) - len(value.lstrip())
+    if stripped and not (0x20 < stripped[0] < 0x80 and 0x20 < stripped[-1] < 0x80):
+        text = stripped.decode(encoding, errors="replace")
+        core = text.strip()
+        if not core:
+            return lead, 0
+        if len(core) != len(text):
+            head = len(text[:len(text) - len(text.lstrip())].encode(encoding))
+            tail = len(text[len(text.rstrip()):].encode(encoding))
+            return lead + head, len(stripped) - head - tail
+    return lead, len(stripped)
+
+
+class IniIndex(Mapping):
+    """
+    Read-only key -> value mapping over a single ini buffer.
+    Keys keep file order; values are decoded on access.
+    """
+    def __init__(self, buffer, encoding: str = "utf-8", bom: bytes = b"", path: Optional[Path] = None,
+                 index: Optional[Tuple[List[str], array, array]] = None):
+        self.buffer = buffer
+        self.encoding = encoding  # encoding of the buffer (always ASCII compatible)
+        self.bom = bom            # BOM found in the source file
+        self.path = path
+        self._start = len(bom) if bom and buffer[:len(bom)] == bom else 0
+        self._folded: Optional[Dict[str, str]] = None
+        if index is not None:
+            # Prebuilt (keys, offsets, lengths), e.g. from ini_cache
+            keys, self._offsets, self._lengths = index
+            self._slots: Dict[str, int] = dict(zip(keys, range(len(keys))))
+        else:
+            self._slots = {}
+            self._offsets = array("I")
+            self._lengths = array("I")
+            self._build()
+
+    def _build(self):
+        slots = self._slots
+        offsets = self._offsets
+        lengths = self._lengths
+        buf = self.buffer
+        encoding = self.encoding
+        size = len(buf)
+
+        pos = self._start
+        while pos < size:
+            # Scan in whole-line chunks so the transient split list stays small
+            end = min(pos + SCAN_CHUNK, size)
+            if end < size:
+                newline = buf.rfind(b"\n", pos, end)
+                end = newline + 1 if newline != -1 else size
+
+            offset = pos
+            for line in buf[pos:end].split(b"\n"):
+                key, sep, value = line.partition(b"=")
+                if sep:
+                    name = key.strip()
+                    if name and name[:1] not in (b";", b"#"):
+                        name = name.decode(encoding, errors="replace").strip()
+                        lead, length = _strip_span(value, encoding)
+                        start = offset + len(key) + 1 + lead
+
+                        slot = slots.get(name)
+                        if slot is None:
+                            slots[name] = len(offsets)
+                            offsets.append(start)
+                            lengths.append(length)
+                        else:
+                            # Duplicate key: last value wins, first position is kept
+                            offsets[slot] = start
+                            lengths[slot] = length
+                offset += len(line) + 1
+            pos = end
+
+    def __getitem__(self, key: str) -> str:
+        slot = self._slots[key]
+        start = self._offsets[slot]
+        return self.buffer[start:start + self._lengths[slot]].decode(self.encoding, errors="replace")
+
+    def __contains__(self, key) -> bool:
+        return key in self._slots
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._slots)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def close(self):
+        """Release the underlying buffer (no-op for in-memory files)."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def data_start(self) -> int:
+        """Offset of the first byte after the BOM."""
+        return self._start
+
+    def index(self) -> Tuple[List[str], array, array]:
+        """The raw (keys, offsets, lengths) index, in file order."""
+        return list(self._slots), self._offsets, self._lengths
+
+    @property
+    def output_encoding(self) -> str:
+        """Text encoding that writes the file back with its original BOM."""
+        if self.bom == BOM_UTF8:
+            return "utf-8-sig"
+        if self.bom:
+            return "utf-16"
+        return self.encoding
+
+    def casefold_keys(self) -> Dict[str, str]:
+        """Case-folded key -> first key with that spelling, built on first use."""
+        if self._folded is None:
+            self._folded = casefold_keys(self._slots)
+        return self._folded
+
+    def span(self, key: str) -> Tuple[int, int]:
+        """Return the (offset, length) of a (stripped) value inside the buffer."""
+        slot = self._slots[key]
+        return self._offsets[slot], self._lengths[slot]
+
+    def raw_span(self, key: str) -> Tuple[int, int]:
+        """
+        (offset, length) of everything between the key's '=' and its line ending,
+        surrounding whitespace included: the bytes a "key=value" rewrite replaces.
+        """
+        buf = self.buffer
+        start, _ = self.span(key)
+        line_start = buf.rfind(b"\n", 0, start) + 1
+        value_start = buf.find(b"=", line_start, start + 1) + 1
+        end = buf.find(b"\n", start)
+        if end == -1:
+            end = len(buf)
+        if buf[end - 1:end] == b"\r" and end - 1 >= value_start:
+            end -= 1
+        return value_start, end - value_start
+
+    def text(self) -> str:
+        """Decode the whole file (without BOM), normalising line endings to \\n."""
+        text = self.buffer[self._start:].decode(self.encoding, errors="replace")
+        return text.replace("\r\n", "\n")
+
+    def lines(self, keepends: bool = False) -> List[str]:
+        """Return every line of the file, including comments and blanks."""
+        parts = self.text().split("\n")
+        if not keepends:
+            if parts and parts[-1] == "":
+                parts.pop()
+            return parts
+
+        lines = [part + "\n" for part in parts[:-1]]
+        if parts[-1]:
+            lines.append(parts[-1])
+        return lines
+
+    def line_numbers(self) -> Dict[str, int]:
+        """Map each key to the (0 based) line it was last defined on."""
+        buf = self.buffer
+        order = sorted(range(len(self._offsets)), key=self._offsets.__getitem__)
+        key_for_slot = list(self._slots)
+
+        line_map = {}
+        line = 0
+        pos = self._start
+        for slot in order:
+            offset = self._offsets[slot]
+            line += buf[pos:offset].count(b"\n")
+            pos = offset
+            line_map[key_for_slot[slot]] = line
+        # Restore file order
+        return {key: line_map[key] for key in key_for_slot}
+
+
+def casefold_keys(mapping) -> Dict[str, str]:
+    """
+    Secondary index for case-insensitive key lookups: case-folded key -> original key.
+    The first key in iteration order wins; IniIndex caches its own copy.
+    """
+    if isinstance(mapping, IniIndex):
+        return mapping.casefold_keys()
+    folded = {}
+    for key in mapping:
+        folded.setdefault(key.casefold(), key)
+    return folded
+
+
+def _transcode(data, encoding: str, bom_length: int) -> bytes:
+    """Re-encode a UTF-16 file as UTF-8 so the byte scan stays ASCII compatible."""
+    return data[bom_length:].decode(encoding, errors="replace").encode("utf-8")
+
+
+def parse_ini_bytes(data: bytes, path: Optional[Path] = None) -> IniIndex:
+    """Build an IniIndex from raw file bytes."""
+    encoding, bom_length = detect_encoding(data)
+    bom = data[:bom_length]
+    if encoding.startswith("utf-16"):
+        data = _transcode(data, encoding, bom_length)
+        encoding = "utf-8"
+    return IniIndex(data, encoding, bom, path)
+
+
+def _index_file(ini_path: Path, stat: os.stat_result, data, use_cache: bool) -> IniIndex:
+    """Index raw file data (bytes or mmap), going through the on-disk cache when enabled."""
+    cached = ini_cache.lookup(ini_path, stat, data) if use_cache else None
+    if cached is not None:
+        encoding, bom_length, *index = cached
+    else:
+        encoding, bom_length = detect_encoding(data)
+        index = None
+    bom = data[:bom_length]
+
+    cls = MappedIni if isinstance(data, mmap.mmap) else IniIndex
+    buffer, buffer_encoding = data, encoding
+    if encoding.startswith("utf-16"):
+        buffer, buffer_encoding, cls = _transcode(data, encoding, bom_length), "utf-8", IniIndex
+
+    ini = cls(buffer, buffer_encoding, bom, ini_path, index)
+    if use_cache and cached is None:
+        ini_cache.store(ini_path, stat, data, encoding, bom_length, *ini.index())
+    if buffer is not data and isinstance(data, mmap.mmap):
+        data.close()
+    return ini
+
+
+def load_ini(ini_path: Path, use_cache: bool = True) -> IniIndex:
+    """
+    Load an ini file through the shared index.
+    Each file is read and parsed at most once per process while it is unchanged,
+    and the key index is reused from .cache/ini/ across runs.
+    """
+    ini_path = Path(ini_path)
+    stat = os.stat(ini_path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    cache_key = str(ini_path.resolve())
+
+    cached = _loaded.get(cache_key)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(ini_path, "rb") as f:
+        data = f.read()
+
+    ini = _index_file(ini_path, stat, data, use_cache)
+    _loaded[cache_key] = (stamp, ini)
+    return ini
+
+
+class MappedIni(IniIndex):
+    """
+    IniIndex over a read-only mmap of the file.
+    Only the offset index lives on the heap; values are decoded from the
+    mapped pages on access. Close it before writing to the same file.
+    """
+    def close(self):
+        self.buffer.close()
+
+
+def map_ini(ini_path: Path, use_cache: bool = True) -> IniIndex:
+    """
+    Open an ini file as a lazily decoded, memory-mapped view.
+    UTF-16 and empty files fall back to a regular in-memory IniIndex.
+    """
+    ini_path = Path(ini_path)
+    with open(ini_path, "rb") as f:
+        stat = os.fstat(f.fileno())
+        if stat.st_size == 0:
+            return parse_ini_bytes(b"", ini_path)
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return _index_file(ini_path, stat, buffer, use_cache)
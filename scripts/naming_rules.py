@@ -0,0 +1,134 @@
+"""
+Naming rules for audited items.
+
+Each rule maps one or more AttachDef types to an extraction spec (where the
+files live, which attributes an item needs) and a name template (the code
+every localized name must carry and where it goes). The auditor and the
+fixer both read names through these rules, and the XML walker evaluates all
+of them in the same pass, so a new item type is one more RULES entry.
+"""
+
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+# "Class: Military" in the description -> prefix letter
+CLASS_PREFIXES = {
+    'Military': 'M',
+    'Civilian': 'C',
+    'Industrial': 'I',
+    'Stealth': 'S',
+    'Competition': 'R',
+}
+DEFAULT_CLASS_PREFIX = 'C'
+CLASS_PATTERN = re.compile(r"Class:\s*(\w+)", re.IGNORECASE)
+
+# Existing codes, stripped before the expected one is applied
+CODE_PATTERNS = {
+    'prefix': re.compile(r"^([A-Z][0-9][A-Z])\s+(.*)"),  # "C1A PowerBolt"
+    'suffix': re.compile(r"(.*?)\s+(S[0-9]+)$"),         # "Omnisky-3 S1"
+}
+
+
+class NamingRule:
+    """
+    Extraction spec and name template for one kind of item.
+
+    types:       AttachDef Type values the rule applies to
+    dirs:        scitem subdirectories these items live in (component manifest), matched
+                 against the end of the directory path, e.g. 'ships/weapons'
+    keywords:    file name fragments for items found outside those directories
+    required:    AttachDef attributes an item must have to be audited
+    template:    code every name must carry, formatted from size, grade and class_prefix
+    position:    'prefix' ("C1A Name") or 'suffix' ("Name S1")
+    short_names: whether the ShortName token follows the template as well
+    """
+    def __init__(self, name: str, types: Tuple[str, ...], dirs: Tuple[str, ...], template: str,
+                 position: str = 'prefix', required: Tuple[str, ...] = ('Size', 'Grade'),
+                 keywords: Tuple[str, ...] = (), short_names: bool = False):
+        self.name = name
+        self.types = types
+        self.dirs = dirs
+        self.template = template
+        self.position = position
+        self.required = required
+        self.keywords = keywords
+        self.short_names = short_names
+        self.pattern = CODE_PATTERNS[position]
+
+    def __repr__(self):
+        return f"NamingRule({self.name}, Types={self.types}, Template={self.position}:{self.template})"
+
+    def tokens(self, comp) -> List[str]:
+        """Localization tokens (with '@') whose values must follow the rule."""
+        tokens = [comp.token]
+        if self.short_names and comp.short_token:
+            tokens.append(comp.short_token)
+        return tokens
+
+    def code(self, comp) -> str:
+        """Expected code for an item whose item_class has been resolved."""
+        class_prefix = CLASS_PREFIXES.get(comp.item_class, DEFAULT_CLASS_PREFIX)
+        return self.template.format(size=comp.size, grade=comp.grade, class_prefix=class_prefix)
+
+    def expected(self, code: str) -> str:
+        """Expected name pattern, for reports."""
+        return f"{code} ..." if self.position == 'prefix' else f"... {code}"
+
+    def has_code(self, name: str, code: str) -> bool:
+        if self.position == 'prefix':
+            return name.startswith(code)
+        return name == code or name.endswith(f" {code}")
+
+    def split(self, name: str) -> Tuple[Optional[str], str]:
+        """Split a name into (existing code or None, base name)."""
+        match = self.pattern.match(name)
+        if not match:
+            return None, name
+        if self.position == 'prefix':
+            return match.group(1), match.group(2)
+        return match.group(2), match.group(1)
+
+    def apply(self, name: str, code: str) -> str:
+        """The name with its existing code (if any) replaced by code."""
+        _, base_name = self.split(name)
+        if self.position == 'prefix':
+            return f"{code} {base_name}"
+        return f"{base_name} {code}"
+
+
+RULES = [
+    # The [Class][Size][Grade] prefix the audit has always enforced
+    NamingRule(
+        'ship_component', ('Cooler', 'PowerPlant', 'Shield', 'QuantumDrive'),
+        dirs=('cooler', 'powerplant', 'shieldgenerator', 'quantumdrive'),
+        keywords=('shield', 'power', 'cooler', 'quantum', 'shld', 'powr', 'cool', 'qdrv'),
+        template='{class_prefix}{size}{grade}',
+    ),
+    # The S<size> suffix of the "ship weapons" section of target_strings.ini
+    NamingRule(
+        'ship_weapon', ('WeaponGun',),
+        dirs=('ships/weapons',),
+        template='S{size}', position='suffix', required=('Size',), short_names=True,
+    ),
+]
+
+RULES_BY_TYPE: Dict[str, NamingRule] = {t: rule for rule in RULES for t in rule.types}
+
+
+def rule_for(comp_type: str) -> Optional[NamingRule]:
+    return RULES_BY_TYPE.get(comp_type)
+
+
+def manifest_layout() -> Tuple[Dict[str, str], List[str]]:
+    """(scitem subdirectory -> rule name, file keywords) for the component manifest."""
+    dirs = {d: rule.name for rule in RULES for d in rule.dirs}
+    keywords = [k for rule in RULES for k in rule.keywords]
+    return dirs, keywords
+
+
+def resolve_class(comp, lang_pack: Mapping[str, str]) -> str:
+    """Read "Class: ..." from the item description and store it on comp.item_class."""
+    description_text = lang_pack.get(comp.description_token.lstrip('@'), "")
+    class_match = CLASS_PATTERN.search(description_text)
+    comp.item_class = class_match.group(1).capitalize() if class_match else "Unknown"
+    return comp.item_class
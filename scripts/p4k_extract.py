@@ -0,0 +1,229 @@
+"""
+Batched extraction of the files a run needs from Data.p4k.
+
+Each target lists the archive paths it can come from, in order of preference
+(e.g. Data/Game2.dcb, then Data/Game.dcb). unp4k.exe takes one
+case-insensitive substring filter per run and rescans the whole archive every
+time, so the candidates of a target are folded into a single shared filter
+(their common suffix, e.g. ".dcb") and each target costs one pass. Fallbacks
+are resolved from what that pass extracted, and the passes for different
+targets run concurrently.
+
+Before any tool runs, targets are read straight from the archive with
+p4k_reader: one central directory lookup per candidate and a streamed copy of
+the chosen entry, without rescanning the archive. Only targets the reader
+cannot handle (unreadable archive, encrypted or zstd entries without the
+zstandard package) go through the tool.
+
+The tool is any command that takes "<archive> <filter>", extracts into its
+working directory and prints one "method | crypto | path" line per file, so
+a stand-in script works for testing.
+"""
+
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from p4k_reader import P4kArchive, P4kError
+
+MIN_FILTER = 4          # shortest shared filter worth using (".dcb"); below that each candidate gets its own pass
+EXTRACT_TIMEOUT = 300   # seconds per tool run
+MTIME_SLACK = 2         # seconds of file timestamp granularity allowed when judging whether a file is from this run
+
+
+class P4kTarget:
+    """One file needed from the archive."""
+    def __init__(self, name: str, candidates: Sequence[str], output_dir: Path, reuse: bool = False):
+        self.name = name
+        self.candidates = list(candidates)  # archive paths, most preferred first
+        self.output_dir = Path(output_dir)
+        self.reuse = reuse                  # keep an already extracted copy instead of extracting again
+
+    def __repr__(self):
+        return f"P4kTarget({self.name}, Candidates={self.candidates}, Output={self.output_dir})"
+
+    def local_paths(self) -> List[Tuple[str, Path]]:
+        return [(c, self.output_dir / c) for c in self.candidates]
+
+    def existing(self) -> Optional[Path]:
+        """First candidate already present in the output directory."""
+        for _, path in self.local_paths():
+            if path.exists():
+                return path
+        return None
+
+
+def common_filter(candidates: Sequence[str]) -> Optional[str]:
+    """Longest case-insensitive suffix shared by all candidates, if it is selective enough."""
+    names = [c.replace("\\", "/").lower() for c in candidates]
+    suffix = names[0]
+    for name in names[1:]:
+        while not name.endswith(suffix):
+            suffix = suffix[1:]
+    # Cut to a path/extension boundary so the filter does not start mid-word
+    for i, ch in enumerate(suffix):
+        if ch in "/.":
+            suffix = suffix[i:]
+            break
+    else:
+        suffix = suffix if suffix in names else ""
+    return suffix if len(suffix) >= MIN_FILTER else None
+
+
+def plan_filters(target: P4kTarget) -> List[str]:
+    """unp4k filters for a target: one shared filter, or one per candidate in fallback order."""
+    if len(target.candidates) == 1:
+        return list(target.candidates)
+    shared = common_filter(target.candidates)
+    return [shared] if shared else list(target.candidates)
+
+
+def run_tool(tool: Sequence[str], p4k_path: Path, filter_pattern: str, output_dir: Path,
+             timeout: int = EXTRACT_TIMEOUT) -> Tuple[bool, Dict[str, float], float]:
+    """
+    Run one extraction pass.
+    Returns (success, seconds per extracted archive path, total seconds).
+    The time of a file is the gap since the previous file was reported.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # The tool runs inside output_dir, so relative paths have to be resolved first
+    tool = [str(Path(arg).resolve()) if Path(arg).exists() else arg for arg in tool]
+    cmd = [*tool, str(Path(p4k_path).resolve()), filter_pattern]
+    timings = {}
+    messages = []
+    start = last = time.perf_counter()
+
+    try:
+        proc = subprocess.Popen(
+            cmd, cwd=output_dir, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            text=True, errors="replace",
+        )
+    except OSError as e:
+        print(f"ERROR: Could not start {tool[0]}: {e}")
+        return False, timings, 0.0
+
+    watchdog = threading.Timer(timeout, proc.kill)
+    watchdog.start()
+    try:
+        for line in proc.stdout:
+            # "Deflated | Plain | Data/Game2.dcb"
+            parts = line.rstrip().rsplit(" | ", 2)
+            if len(parts) == 3:
+                now = time.perf_counter()
+                timings[parts[2]] = now - last
+                last = now
+            else:
+                messages.append(line.rstrip())
+        proc.wait()
+    finally:
+        watchdog.cancel()
+    total = time.perf_counter() - start
+
+    if total >= timeout:
+        print(f"ERROR: Extraction of '{filter_pattern}' timed out")
+        return False, timings, total
+    if proc.returncode != 0:
+        print(f"ERROR: {Path(tool[-1]).name} failed with code {proc.returncode} for '{filter_pattern}'")
+        print("\n".join(messages[-20:]))
+        return False, timings, total
+    return True, timings, total
+
+
+def extract_target(tool: Sequence[str], p4k_path: Path, target: P4kTarget) -> Tuple[Optional[Path], List[Tuple[str, float]]]:
+    """
+    Extract one target, trying its filters in order until a candidate exists.
+    Returns (extracted file or None, [(archive path or filter, seconds)]).
+    """
+    timings = []
+    for filter_pattern in plan_filters(target):
+        started = time.time()
+        ok, file_timings, seconds = run_tool(tool, p4k_path, filter_pattern, target.output_dir)
+        lowered = {name.replace("\\", "/").lower(): t for name, t in file_timings.items()}
+        timings.extend(file_timings.items() if file_timings else [(filter_pattern, seconds)])
+        if not ok:
+            continue
+        for candidate, path in target.local_paths():
+            # Only accept files from this pass (a stale copy may linger from an older patch):
+            # reported by the tool or, if its output could not be parsed, written since it started
+            if not path.exists():
+                continue
+            if file_timings:
+                fresh = candidate.lower() in lowered
+            else:
+                fresh = path.stat().st_mtime >= started - MTIME_SLACK
+            if fresh:
+                return path, timings
+    return None, timings
+
+
+def extract_native(p4k_path: Path, targets: List[P4kTarget]) -> Tuple[Dict[str, Optional[Path]], List[P4kTarget]]:
+    """
+    Extract targets directly from the archive, opened once for all of them.
+    Returns (target name -> extracted file or None if no candidate exists, targets left for the tool).
+    """
+    results: Dict[str, Optional[Path]] = {}
+    try:
+        archive = P4kArchive(p4k_path)
+    except (OSError, P4kError) as e:
+        print(f"Native p4k reader unavailable ({e}), using the extraction tool.")
+        return results, list(targets)
+
+    remaining = []
+    with archive:
+        for target in targets:
+            start = time.perf_counter()
+            try:
+                entry = archive.first(target.candidates)
+                path = archive.extract(entry, target.output_dir) if entry is not None else None
+            except (OSError, P4kError) as e:
+                print(f"  {target.name}: {e}, falling back to the extraction tool")
+                remaining.append(target)
+                continue
+            results[target.name] = path
+            status = f"-> {path}" if path else "NOT FOUND"
+            print(f"  {target.name} {status}")
+            if entry is not None:
+                print(f"    {time.perf_counter() - start:7.2f}s  {entry.name}")
+    return results, remaining
+
+
+def extract_targets(p4k_path: Path, targets: List[P4kTarget], tool: Sequence[str],
+                    native: bool = True) -> Dict[str, Optional[Path]]:
+    """
+    Extract every target, natively where possible and otherwise in one tool pass
+    each, running the passes concurrently.
+    Returns target name -> extracted (or reused) file, None if no candidate was found.
+    """
+    results: Dict[str, Optional[Path]] = {}
+    pending = []
+    for target in targets:
+        existing = target.existing() if target.reuse else None
+        if existing is not None:
+            print(f"{target.name}: already extracted at {existing}, skipping.")
+            results[target.name] = existing
+        else:
+            pending.append(target)
+
+    if pending:
+        print(f"Extracting {', '.join(t.name for t in pending)} from {Path(p4k_path).name}...")
+        start = time.perf_counter()
+        if native:
+            extracted, pending = extract_native(p4k_path, pending)
+            results.update(extracted)
+
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as pool:
+                outcomes = list(pool.map(lambda t: extract_target(tool, p4k_path, t), pending))
+
+            for target, (path, timings) in zip(pending, outcomes):
+                results[target.name] = path
+                status = f"-> {path}" if path else "NOT FOUND"
+                print(f"  {target.name} {status}")
+                for name, seconds in timings:
+                    print(f"    {seconds:7.2f}s  {name}")
+        print(f"Extraction finished in {time.perf_counter() - start:.2f}s")
+
+    return results
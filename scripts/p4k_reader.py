@@ -0,0 +1,298 @@
+"""
+Pure-Python reader for Data.p4k.
+
+A p4k is a ZIP64 archive: a central directory at the end lists every entry,
+each entry's data follows its local header, and entries are stored, deflated
+or zstd-compressed (method 100). The archive is memory-mapped and only the
+central directory is read to answer "does this file exist"; single entries
+are then streamed out in chunks, so pulling Game2.dcb or global.ini needs no
+external process and no scan over the data itself.
+
+Zstd entries need the optional zstandard package. Encrypted entries are not
+supported; callers fall back to unp4k.exe for those.
+"""
+
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None  # only needed for zstd-compressed entries
+
+# Errors a corrupt entry raises while being decompressed
+DECOMPRESS_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+EOCD = struct.Struct("<4sHHHHIIH")                  # end of central directory
+ZIP64_LOCATOR = struct.Struct("<4sIQI")
+ZIP64_EOCD = struct.Struct("<4sQHHIIQQQQ")
+CENTRAL_HEADER = struct.Struct("<4sHHHHHHIIIHHHHHII")
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+
+SIG_EOCD = b"PK\x05\x06"
+SIG_ZIP64_LOCATOR = b"PK\x06\x07"
+SIG_ZIP64_EOCD = b"PK\x06\x06"
+SIG_CENTRAL = b"PK\x01\x02"
+SIG_LOCAL = b"PK\x03\x04"
+SIG_LOCAL_P4K = b"PK\x03\x14"                      # CIG's variant, used by Data.p4k
+LOCAL_SIGNATURES = (SIG_LOCAL, SIG_LOCAL_P4K)
+
+STORED, DEFLATED, ZSTD = 0, 8, 100
+FLAG_ENCRYPTED = 0x1
+CHUNK = 1 << 20  # bytes per streamed read
+
+
+class P4kError(Exception):
+    """The archive or an entry cannot be read natively."""
+
+
+class P4kEntry:
+    """One central directory record."""
+    __slots__ = ("name", "method", "flags", "crc", "compressed_size", "size", "header_offset")
+
+    def __init__(self, name, method, flags, crc, compressed_size, size, header_offset):
+        self.name = name
+        self.method = method
+        self.flags = flags
+        self.crc = crc
+        self.compressed_size = compressed_size
+        self.size = size
+        self.header_offset = header_offset
+
+    @property
+    def encrypted(self) -> bool:
+        return bool(self.flags & FLAG_ENCRYPTED)
+
+    def __repr__(self):
+        return f"P4kEntry({self.name}, Method={self.method}, Size={self.size})"
+
+
+# Path folding for lookups: ASCII case and backslashes (p4k names are Data\Game2.dcb)
+FOLD = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ\\", b"abcdefghijklmnopqrstuvwxyz/")
+
+
+def normalize(name: str) -> str:
+    """Archive path key: forward slashes, ASCII case-folded."""
+    return name.encode("utf-8").translate(FOLD).decode("utf-8", errors="replace")
+
+
+def _zip64_extra(extra: bytes, size: int, compressed_size: int, offset: int) -> Tuple[int, int, int]:
+    """Replace 0xFFFFFFFF fields with their values from the ZIP64 extra field."""
+    pos = 0
+    while pos + 4 <= len(extra):
+        tag, length = struct.unpack_from("<HH", extra, pos)
+        if tag == 0x0001:
+            fields = extra[pos + 4:pos + 4 + length]
+            values = list(struct.unpack_from(f"<{len(fields) // 8}Q", fields))
+            if size == 0xFFFFFFFF and values:
+                size = values.pop(0)
+            if compressed_size == 0xFFFFFFFF and values:
+                compressed_size = values.pop(0)
+            if offset == 0xFFFFFFFF and values:
+                offset = values.pop(0)
+            break
+        pos += 4 + length
+    return size, compressed_size, offset
+
+
+class P4kArchive:
+    """Memory-mapped p4k with lazy central directory lookups."""
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise P4kError(f"{self.path} is empty")
+        try:
+            self.cd_offset, self.cd_size, self.count = self._locate_directory()
+        except P4kError:
+            self.close()
+            raise
+        self._entries: Optional[Dict[str, P4kEntry]] = None
+        self._folded: Optional[bytes] = None
+
+    def close(self):
+        self._folded = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _locate_directory(self) -> Tuple[int, int, int]:
+        try:
+            return self._read_end_records()
+        except struct.error as e:
+            raise P4kError(f"{self.path.name}: truncated end of central directory ({e})")
+
+    def _read_end_records(self) -> Tuple[int, int, int]:
+        buf = self._map
+        size = len(buf)
+        # EOCD sits in the last 64 KiB (+ its own size) because of the trailing comment
+        start = max(0, size - 0xFFFF - EOCD.size)
+        pos = buf.rfind(SIG_EOCD, start)
+        if pos < 0:
+            raise P4kError(f"{self.path.name}: no end of central directory record")
+        _, _, _, _, count, cd_size, cd_offset, _ = EOCD.unpack_from(buf, pos)
+
+        locator = pos - ZIP64_LOCATOR.size
+        if locator >= 0 and buf[locator:locator + 4] == SIG_ZIP64_LOCATOR:
+            _, _, eocd64_offset, _ = ZIP64_LOCATOR.unpack_from(buf, locator)
+            if buf[eocd64_offset:eocd64_offset + 4] != SIG_ZIP64_EOCD:
+                raise P4kError(f"{self.path.name}: broken ZIP64 end of central directory")
+            fields = ZIP64_EOCD.unpack_from(buf, eocd64_offset)
+            count, cd_size, cd_offset = fields[7], fields[8], fields[9]
+        return cd_offset, cd_size, count
+
+    def _read_central(self, pos: int) -> Tuple[P4kEntry, int]:
+        """Parse the central directory record at pos; returns (entry, next record position)."""
+        buf = self._map
+        try:
+            header = CENTRAL_HEADER.unpack_from(buf, pos)
+        except struct.error:
+            header = (None,)
+        if header[0] != SIG_CENTRAL:
+            raise P4kError(f"{self.path.name}: bad central directory record at {pos}")
+        (_, _, _, flags, method, _, _, crc, compressed_size, size,
+         name_length, extra_length, comment_length, _, _, _, offset) = header
+        name_start = pos + CENTRAL_HEADER.size
+        name = buf[name_start:name_start + name_length].decode("utf-8", errors="replace")
+        if 0xFFFFFFFF in (compressed_size, size, offset):
+            extra_start = name_start + name_length
+            try:
+                size, compressed_size, offset = _zip64_extra(
+                    buf[extra_start:extra_start + extra_length], size, compressed_size, offset)
+            except struct.error:
+                raise P4kError(f"{self.path.name}: bad ZIP64 extra field for {name}")
+        entry = P4kEntry(name, method, flags, crc, compressed_size, size, offset)
+        return entry, name_start + name_length + extra_length + comment_length
+
+    def entries(self) -> Dict[str, P4kEntry]:
+        """Every entry, keyed by normalized path (built once, on first use)."""
+        if self._entries is None:
+            entries = {}
+            pos = self.cd_offset
+            for _ in range(self.count):
+                entry, pos = self._read_central(pos)
+                entries.setdefault(normalize(entry.name), entry)
+            self._entries = entries
+        return self._entries
+
+    def _folded_directory(self) -> bytes:
+        """The central directory with names folded like FOLD (same offsets, built once)."""
+        if self._folded is None:
+            self._folded = self._map[self.cd_offset:self.cd_offset + self.cd_size].translate(FOLD)
+        return self._folded
+
+    def get(self, name: str) -> Optional[P4kEntry]:
+        """
+        Look an entry up by path (either slash, any case).
+        One byte search over the folded central directory, so neither hits nor
+        misses need the full listing.
+        """
+        if self._entries is not None:
+            return self._entries.get(normalize(name))
+        folded = self._folded_directory()
+        needle = name.encode("utf-8").translate(FOLD)
+        pos = folded.find(needle)
+        while pos >= 0:
+            # A name starts right after its record's fixed header and fills its name field.
+            # The header is checked in the mapped bytes, folding touches it as well.
+            record = self.cd_offset + pos - CENTRAL_HEADER.size
+            if record >= self.cd_offset and self._map[record:record + 4] == SIG_CENTRAL:
+                name_length = struct.unpack_from("<H", self._map, record + 28)[0]
+                if name_length == len(needle):
+                    return self._read_central(record)[0]
+            pos = folded.find(needle, pos + 1)
+        return None
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name) is not None
+
+    def first(self, candidates: Sequence[str]) -> Optional[P4kEntry]:
+        """First candidate path that exists in the archive."""
+        for candidate in candidates:
+            entry = self.get(candidate)
+            if entry is not None:
+                return entry
+        return None
+
+    def _data_range(self, entry: P4kEntry) -> Tuple[int, int]:
+        buf = self._map
+        try:
+            header = LOCAL_HEADER.unpack_from(buf, entry.header_offset)
+        except struct.error:
+            header = (None,)
+        if header[0] not in LOCAL_SIGNATURES:
+            raise P4kError(f"{entry.name}: bad local header")
+        start = entry.header_offset + LOCAL_HEADER.size + header[9] + header[10]
+        if start + entry.compressed_size > len(buf):
+            raise P4kError(f"{entry.name}: data runs past the end of the archive")
+        return start, start + entry.compressed_size
+
+    def _chunks(self, entry: P4kEntry, decompressor, start: int, end: int) -> Iterator[bytes]:
+        """Raw or decompressed data of start..end in CHUNK reads; corrupt data raises P4kError."""
+        with memoryview(self._map) as view:
+            try:
+                for pos in range(start, end, CHUNK):
+                    chunk = view[pos:min(pos + CHUNK, end)]
+                    yield decompressor.decompress(chunk) if decompressor else bytes(chunk)
+                if decompressor is not None:
+                    yield decompressor.flush()
+            except DECOMPRESS_ERRORS as e:
+                raise P4kError(f"{entry.name}: corrupt compressed data ({e})")
+
+    def stream(self, entry: P4kEntry) -> Iterator[bytes]:
+        """Yield the decompressed data of an entry in chunks, checking its CRC."""
+        if entry.encrypted:
+            raise P4kError(f"{entry.name}: encrypted entries are not supported")
+        if entry.method == STORED:
+            decompressor = None
+        elif entry.method == DEFLATED:
+            decompressor = zlib.decompressobj(-15)
+        elif entry.method == ZSTD:
+            if zstandard is None:
+                raise P4kError(f"{entry.name}: zstd entry, install the 'zstandard' package")
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+        else:
+            raise P4kError(f"{entry.name}: unsupported compression method {entry.method}")
+
+        start, end = self._data_range(entry)
+        crc = 0
+        for data in self._chunks(entry, decompressor, start, end):
+            if data:
+                crc = zlib.crc32(data, crc)
+                yield data
+        if entry.crc and crc != entry.crc:
+            raise P4kError(f"{entry.name}: CRC mismatch")
+
+    def read(self, name: str) -> bytes:
+        entry = self.get(name)
+        if entry is None:
+            raise KeyError(name)
+        return b"".join(self.stream(entry))
+
+    def extract(self, entry: P4kEntry, output_dir: Path) -> Path:
+        """Write an entry below output_dir at its archive path (like unp4k does)."""
+        target = Path(output_dir) / entry.name.replace("\\", "/")
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = target.with_name(target.name + ".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                for data in self.stream(entry):
+                    f.write(data)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        os.replace(tmp_path, target)
+        return target
+
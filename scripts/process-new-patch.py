@@ -6,28 +6,32 @@ Updates new entries based on extracted game data using unp4k
 
 """
 import sys
+import json
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Mapping, Optional, Tuple
 import os
 import subprocess
 import shutil
 import tempfile
 
+from ini_index import IniIndex, load_ini
+
 # Configuration
 SC_INSTALL_PATH = r"C:\Program Files\Roberts Space Industries\StarCitizen" # CHANGE THIS IF ITS NOT CORRECT FOR YOU
 REPO_ROOT = Path.cwd()
 current_version = None
 
-def read_ini_file(file_path: Path) -> Dict[str, str]:
-    """Read an ini file and return a dict of key=value pairs."""
-    entries = {}
+WRITE_BUFFER = 1 << 20  # 1 MiB buffered writes for the generated ini
+
+# Keys to always take from new stock (do not preserve old remix value)
+FORCE_NEW_KEYS = {
+    'Frontend_PU_Version'
+}
+
+def read_ini_file(file_path: Path) -> IniIndex:
+    """Read an ini file through the shared index (read-only key=value mapping)."""
     try:
-        with open(file_path, 'r', encoding='utf-8-sig', errors='replace') as f:
-            for line in f:
-                line = line.strip()
-                if '=' in line and not line.startswith(';'):
-                    key, value = line.split('=', 1)
-                    entries[key] = value
+        entries = load_ini(file_path)
     except FileNotFoundError:
         print(f"Error: File not found: {file_path}")
         sys.exit(1)
@@ -166,15 +170,104 @@ def applyChanges():
     # Step 5: Cleanup
     cleanup_temp(temp_dir, True)
 
-def updateNewIni():
+def diff_ini(old_stock: Optional[Mapping[str, str]], old_remix: Mapping[str, str],
+             new_stock: Mapping[str, str]) -> Tuple[Dict[str, str], Dict]:
+    """
+    Three-way diff of a patch: old stock (base), old remix (ours) and new stock (theirs).
+    Classifies every key and builds the merged remix in one linear pass over the
+    new stock keys, plus one pass over the old remix keys for removals.
+    Without an old stock file, remixed values are detected against the new stock.
+    Returns (merged, changes).
+    """
+    merged = {}
+    changes = {
+        'added': [],       # new in stock, taken as is
+        'removed': [],     # in old remix, gone from new stock
+        'changed': [],     # stock changed, not remixed -> new stock value
+        'conflicts': [],   # stock changed under a remixed value -> remix kept
+        'kept_remix': 0,   # remixed, stock unchanged
+        'unchanged': 0,
+    }
+
+    for key, stock_value in new_stock.items():
+        if key in FORCE_NEW_KEYS:
+            # Special handling for version: use stock value + branding
+            merged[key] = f"{stock_value} - ca1usss version"
+            changes['changed'].append(key)
+            continue
+
+        remix_value = old_remix.get(key)
+        if remix_value is None:
+            merged[key] = stock_value
+            changes['added'].append(key)
+            continue
+
+        base_value = old_stock.get(key) if old_stock is not None else None
+        if remix_value == stock_value:
+            # Stock picked up the remix value (or nothing moved): nothing to resolve
+            merged[key] = stock_value
+            changes['unchanged'] += 1
+            continue
+        if base_value is None:
+            # No base to compare against: keep the remix value (old behaviour)
+            remixed = remix_value != stock_value
+            stock_changed = False
+        else:
+            remixed = remix_value != base_value
+            stock_changed = base_value != stock_value
+
+        if remixed and stock_changed:
+            merged[key] = remix_value
+            changes['conflicts'].append({
+                'key': key,
+                'old_stock': base_value,
+                'new_stock': stock_value,
+                'remix': remix_value,
+            })
+        elif remixed:
+            merged[key] = remix_value
+            changes['kept_remix'] += 1
+        elif stock_changed:
+            merged[key] = stock_value
+            changes['changed'].append(key)
+        else:
+            merged[key] = stock_value
+            changes['unchanged'] += 1
+
+    changes['removed'] = [key for key in old_remix if key not in new_stock]
+    return merged, changes
+
+def write_ini_entries(output_path: Path, entries: Mapping[str, str], sort_keys: bool = False) -> bool:
+    """
+    Write key=value entries in their given order (new stock file order) or sorted.
+    The file is rendered once and left untouched if the content is identical.
+    Returns True if the file was written.
+    """
+    keys = sorted(entries) if sort_keys else entries
+    text = "".join([f"{key}={entries[key]}\n" for key in keys])
+
+    if output_path.exists():
+        with open(output_path, 'r', encoding='utf-8-sig') as f:
+            if f.read() == text:
+                return False
+
+    with open(output_path, 'w', encoding='utf-8-sig', buffering=WRITE_BUFFER) as f:
+        f.write(text)
+    return True
+
+def updateNewIni(sort_keys: bool = False):
     version = find_ini_versions(REPO_ROOT, 'new')
-    current_remix_path = Path(find_ini_versions(REPO_ROOT, 'old')) / 'LIVE' / 'data' / 'Localization' / 'english' / 'global.ini'
+    old_version = find_ini_versions(REPO_ROOT, 'old')
+    current_remix_path = Path(old_version) / 'LIVE' / 'data' / 'Localization' / 'english' / 'global.ini'
+    old_stock_path = Path(old_version) / 'LIVE' / 'stock-global.ini'
     new_stock_path = Path(version) / 'LIVE' / 'stock-global.ini'
     output_path = Path(version) / 'LIVE' / 'data' / 'Localization' / 'english' / 'global.ini'
+    changes_path = Path(version) / 'LIVE' / 'patch-changes.json'
     output_dir = output_path.parent
     
     #we are currently in 4.5.0 so, should be the following
     print(f"Old Remix: {current_remix_path}") 
+    print(f"Old Stock: {old_stock_path}")
     print(f"New Stock: {new_stock_path}")
     print(f"Output:    {output_path}")
 
@@ -191,55 +284,60 @@ def updateNewIni():
     new_stock = read_ini_file(new_stock_path)
     print(f"  Loaded {len(new_stock)} entries")
 
-    # Process: start with new stock, overlay remixed values where keys match
-    print("Processing entries...")
-    new_remix = {}
-    kept_remix_count = 0
-    new_entry_count = 0
-
-    # Keys to always take from new stock (do not preserve old remix value)
-    force_new_keys = {
-        'Frontend_PU_Version'
-    }
+    old_stock = None
+    if old_stock_path.exists():
+        print("Reading old stock ini...")
+        old_stock = read_ini_file(old_stock_path)
+        print(f"  Loaded {len(old_stock)} entries")
+    else:
+        print(f"Warning: Old stock file not found at {old_stock_path}, stock changes under remixed values can't be detected")
 
-    for key, stock_value in new_stock.items():
-        if key == 'Frontend_PU_Version':
-            # Special handling for version: use stock value + branding
-            new_remix[key] = f"{stock_value} - ca1usss version"
-            new_entry_count += 1
-            version = stock_value.split('-')[0].strip()
-        elif key in current_remix and key not in force_new_keys:
-            # This key exists in the old remix, use the remixed value
-            new_remix[key] = current_remix[key]
-            # Check if it was actually remixed (different from stock)
-            if current_remix[key] != stock_value:
-                kept_remix_count += 1
-        else:
-            # New key, keep stock value
-            new_remix[key] = stock_value
-            new_entry_count += 1
+    # Process: three-way diff of old stock / old remix / new stock
+    print("Processing entries...")
+    new_remix, changes = diff_ini(old_stock, current_remix, new_stock)
 
-    print(f"  Kept {kept_remix_count} existing remixed values")
-    print(f"  Added {new_entry_count} new stock entries")
+    print(f"  Kept {changes['kept_remix'] + len(changes['conflicts'])} existing remixed values")
+    print(f"  Added {len(changes['added'])} new stock entries")
+    print(f"  Updated {len(changes['changed'])} changed stock entries")
+    print(f"  Conflicts (stock changed under remix): {len(changes['conflicts'])}")
     print(f"  Total entries: {len(new_remix)}")
 
     # Write output
     print(f"Writing new ini to {output_path}...")
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    with open(output_path, 'w', encoding='utf-8-sig') as f:
-        for key in sorted(new_remix.keys()):
-            f.write(f"{key}={new_remix[key]}\n")
+    if write_ini_entries(output_path, new_remix, sort_keys):
+        print("  Written")
+    else:
+        print("  Unchanged, left as is")
+
+    # Machine readable change set
+    report = {
+        'old_version': Path(old_version).name,
+        'new_version': Path(version).name,
+        'has_old_stock': old_stock is not None,
+        'summary': {name: len(v) if isinstance(v, list) else v for name, v in changes.items()},
+        **changes,
+    }
+    with open(changes_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Change set written to {changes_path}")
 
     print("Done!")
 
     # Report on removed entries
-    removed_keys = set(current_remix.keys()) - set(new_stock.keys())
-    if removed_keys:
-        print(f"\nNote: {len(removed_keys)} entries from old remix not in new stock (removed from game)")
+    if changes['removed']:
+        print(f"\nNote: {len(changes['removed'])} entries from old remix not in new stock (removed from game)")
+    if changes['conflicts']:
+        print(f"Note: {len(changes['conflicts'])} remixed entries changed in stock, review them in {changes_path}")
 
 def main():
-    updateNewIni()
+    import argparse
+    parser = argparse.ArgumentParser(description='Process a new Star Citizen patch global.ini')
+    parser.add_argument('--sorted', action='store_true', help='write keys sorted instead of in stock file order')
+    args = parser.parse_args()
+
+    updateNewIni(sort_keys=args.sorted)
     applyChanges()
 
 
@@ -0,0 +1,163 @@
+"""
+Section-aware model of target_strings.ini.
+
+Sections are delimited by marker comments, e.g. ";commodities start" ...
+";commodities end" or ";ships" ... ";ships end". A bare ";name" only opens a
+section for the headers in SECTION_HEADERS; any other comment is just a
+comment. A section without an end marker (";special stuff") runs until the
+next section starts.
+
+The document keeps every original line (comments, blanks, line endings, BOM)
+and only re-renders lines whose value was edited, so a write-back is
+lossless apart from the edits.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ini_index import sniff_encoding
+
+# Sections opened by a bare ";name" comment (no "start" suffix)
+SECTION_HEADERS = ("ship weapons", "special stuff", "ships", "ui/menu items")
+
+
+class Entry:
+    """A key=value line of the document."""
+    def __init__(self, doc: "TargetStrings", line_no: int, raw_key: str, value: str, section: Optional[str]):
+        self.doc = doc
+        self.line_no = line_no
+        self.raw_key = raw_key  # key as written, including any spacing before '='
+        self.key = raw_key.strip()
+        self.value = value
+        self.section = section
+
+    def set(self, value: str) -> bool:
+        """Change the value; returns True if it actually changed."""
+        if value == self.value:
+            return False
+        self.value = value
+        self.doc._changed.add(self.line_no)
+        return True
+
+    def __repr__(self):
+        return f"Entry({self.key}={self.value!r}, Section={self.section}, Line={self.line_no + 1})"
+
+
+def split_line_ending(line: str) -> Tuple[str, str]:
+    if line.endswith("\r\n"):
+        return line[:-2], "\r\n"
+    if line.endswith("\n"):
+        return line[:-1], "\n"
+    return line, ""
+
+
+def parse_marker(text: str) -> Tuple[Optional[str], bool]:
+    """
+    Parse a ';...' comment as a section marker.
+    Returns (section name, is_end); name is None for non-marker comments.
+    """
+    name = text.strip()[1:].strip().lower()
+    for suffix, is_end in ((" end", True), (" start", False)):
+        if name.endswith(suffix) and name[:-len(suffix)].strip():
+            return name[:-len(suffix)].strip(), is_end
+    if name in SECTION_HEADERS:
+        return name, False
+    return None, False
+
+
+class TargetStrings:
+    """Parsed target_strings.ini: lines, entries and sections."""
+    def __init__(self, path: Path, lines: List[str], encoding: str = "utf-8"):
+        self.path = Path(path)
+        self.encoding = encoding
+        self.lines = lines
+        self.entries: List[Entry] = []
+        self.sections: Dict[str, Tuple[int, int]] = {}  # name -> (first line, end marker line)
+        self._changed = set()
+        self._parse()
+
+    @classmethod
+    def load(cls, path: Path) -> "TargetStrings":
+        path = Path(path)
+        encoding = sniff_encoding(path)
+        # newline="" keeps the original line endings for a lossless write-back
+        with open(path, "r", encoding=encoding, newline="") as f:
+            return cls(path, f.readlines(), encoding)
+
+    def _parse(self):
+        current = None
+        current_start = 0
+
+        for line_no, line in enumerate(self.lines):
+            text, _ = split_line_ending(line)
+            stripped = text.strip()
+
+            if stripped.startswith(";"):
+                name, is_end = parse_marker(stripped)
+                if name is None:
+                    continue
+                if is_end:
+                    if name == current:
+                        self.sections[current] = (current_start, line_no)
+                        current = None
+                    continue
+                if current is not None:
+                    # Previous section had no end marker
+                    self.sections[current] = (current_start, line_no)
+                current, current_start = name, line_no + 1
+                continue
+
+            raw_key, sep, value = text.partition("=")
+            if sep and raw_key.strip() and not stripped.startswith("#"):
+                self.entries.append(Entry(self, line_no, raw_key, value, current))
+
+        if current is not None:
+            self.sections[current] = (current_start, len(self.lines))
+
+    def section(self, name: str) -> List[Entry]:
+        """Entries of one section, in file order."""
+        name = name.lower()
+        if name not in self.sections:
+            raise KeyError(f"No section '{name}' in {self.path.name}")
+        return [e for e in self.entries if e.section == name]
+
+    def __iter__(self) -> Iterator[Entry]:
+        return iter(self.entries)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._changed)
+
+    def _render_line(self, entry: Entry) -> str:
+        _, ending = split_line_ending(self.lines[entry.line_no])
+        return f"{entry.raw_key}={entry.value}{ending}"
+
+    def render(self) -> str:
+        """The document text; only edited lines are re-rendered."""
+        lines = self.lines
+        if self._changed:
+            lines = list(lines)
+            for entry in self.entries:
+                if entry.line_no in self._changed:
+                    lines[entry.line_no] = self._render_line(entry)
+        return "".join(lines)
+
+    def save(self, path: Optional[Path] = None) -> bool:
+        """Write the document back (atomically) if anything changed. Returns True if written."""
+        if not self._changed:
+            return False
+        text = self.render()
+        path = Path(path or self.path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding=self.encoding, newline="") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+        # Edited lines become the new originals
+        for entry in self.entries:
+            if entry.line_no in self._changed:
+                self.lines[entry.line_no] = self._render_line(entry)
+        self._changed.clear()
+        return True
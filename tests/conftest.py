@@ -0,0 +1,30 @@
+import sys
+import zipfile
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "scripts"))
+
+LANG_PACK_ZIP = REPO_ROOT / "4.3.2" / "ScCompLangPackRemix-v5.zip"
+LANG_PACK_INI = "data\\Localization\\english\\global.ini"
+TARGET_STRINGS = REPO_ROOT / "target_strings.ini"
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    """Keep the on-disk ini cache and the per-process index out of the working tree."""
+    import ini_cache
+    import ini_index
+    monkeypatch.setattr(ini_cache, "CACHE_DIR", tmp_path / "cache" / "ini")
+    monkeypatch.setattr(ini_index, "_loaded", {})
+
+
+@pytest.fixture(scope="session")
+def global_ini_bytes():
+    """The real global.ini shipped with the 4.3.2 language pack."""
+    if not LANG_PACK_ZIP.exists():
+        pytest.skip("language pack archive not available")
+    with zipfile.ZipFile(LANG_PACK_ZIP) as archive:
+        return archive.read(LANG_PACK_INI)
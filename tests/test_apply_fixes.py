@@ -0,0 +1,148 @@
+import json
+import os
+
+from apply_fixes import (apply_fixes, apply_patch, can_patch_in_place, load_ini_lines, map_changed_spans,
+                         save_ini_lines, save_patched_ini)
+from audit_sc_native import load_audit_results, write_audit_results
+from ini_index import load_ini, map_ini
+
+SOURCE = (
+    b"\xef\xbb\xbf; header\n"
+    b"a=C1A Frost\n"
+    b"b = M2C PowerBolt \n"
+    b"\n"
+    b"c=Guardian\n"
+    b"d=untouched\n"
+)
+UPDATES = {"c": "M3B Guardian", "a": "C1B Frost", "b": "I2C PowerBolt"}
+
+
+def full_rewrite(path, updates):
+    """The line-based rewrite save_patched_ini replaces."""
+    ini = map_ini(path, use_cache=False)
+    lines = load_ini_lines(ini, updates)
+    ini.close()
+    save_ini_lines(path, lines, ini.output_encoding)
+
+
+def test_can_patch_in_place(tmp_path):
+    utf8 = tmp_path / "utf8.ini"
+    utf8.write_bytes(SOURCE)
+    utf16 = tmp_path / "utf16.ini"
+    utf16.write_text("a=1\n", encoding="utf-16")
+    with map_ini(utf8, use_cache=False) as ini:
+        assert can_patch_in_place(ini)
+    with map_ini(utf16, use_cache=False) as ini:
+        assert not can_patch_in_place(ini)
+
+
+def test_map_changed_spans_in_file_order(tmp_path):
+    path = tmp_path / "global.ini"
+    path.write_bytes(SOURCE)
+    with map_ini(path, use_cache=False) as ini:
+        spans = map_changed_spans(ini, UPDATES)
+    assert [(line, key) for _, _, line, key in spans] == [(1, "a"), (2, "b"), (4, "c")]
+    assert [SOURCE[offset:offset + length] for offset, length, _, _ in spans] == [
+        b"C1A Frost", b" M2C PowerBolt ", b"Guardian"]
+
+
+def test_patch_matches_full_rewrite(tmp_path):
+    patched = tmp_path / "patched.ini"
+    patched.write_bytes(SOURCE)
+    rewritten = tmp_path / "rewritten.ini"
+    rewritten.write_bytes(SOURCE)
+
+    changes = save_patched_ini(map_ini(patched, use_cache=False), UPDATES, patched, patch_path=None)
+    full_rewrite(rewritten, UPDATES)
+
+    assert [c["key"] for c in changes] == ["a", "b", "c"]
+    assert patched.read_bytes() == rewritten.read_bytes()
+    assert dict(load_ini(patched, use_cache=False).items()) == {"d": "untouched", **UPDATES}
+
+
+def test_patch_keeps_crlf_line_endings(tmp_path):
+    path = tmp_path / "global.ini"
+    path.write_bytes(SOURCE.replace(b"\n", b"\r\n"))
+    save_patched_ini(map_ini(path, use_cache=False), UPDATES, path, patch_path=None)
+
+    rewritten = tmp_path / "rewritten.ini"
+    rewritten.write_bytes(SOURCE.replace(b"\n", b"\r\n"))
+    full_rewrite(rewritten, UPDATES)
+
+    assert path.read_bytes() == SOURCE.replace(b"\n", b"\r\n").replace(
+        b"C1A Frost", b"C1B Frost").replace(b" M2C PowerBolt ", b"I2C PowerBolt").replace(b"=Guardian", b"=M3B Guardian")
+    assert dict(load_ini(path, use_cache=False).items()) == dict(load_ini(rewritten, use_cache=False).items())
+
+
+def test_write_and_apply_patch(tmp_path):
+    path = tmp_path / "global.ini"
+    path.write_bytes(SOURCE)
+    patch_path = tmp_path / "fixes.patch.json"
+    save_patched_ini(map_ini(path, use_cache=False), UPDATES, path, patch_path=patch_path)
+
+    patch = json.loads(patch_path.read_text(encoding="utf-8"))
+    assert [(c["key"], c["old"], c["new"]) for c in patch["changes"]] == [
+        ("a", "C1A Frost", "C1B Frost"), ("b", " M2C PowerBolt ", "I2C PowerBolt"), ("c", "Guardian", "M3B Guardian")]
+
+    # Reapplied to a fresh copy of the original it gives the same file, and only once
+    fresh = tmp_path / "fresh.ini"
+    fresh.write_bytes(SOURCE)
+    assert apply_patch(fresh, patch_path) == 3
+    assert fresh.read_bytes() == path.read_bytes()
+    assert apply_patch(fresh, patch_path) == 0
+
+
+def test_apply_patch_to_utf16_file_rewrites_lines(tmp_path):
+    path = tmp_path / "global.ini"
+    path.write_bytes(SOURCE)
+    patch_path = tmp_path / "fixes.patch.json"
+    save_patched_ini(map_ini(path, use_cache=False), UPDATES, path, patch_path=patch_path)
+
+    utf16 = tmp_path / "utf16.ini"
+    utf16.write_text(SOURCE.decode("utf-8-sig"), encoding="utf-16")
+    assert apply_patch(utf16, patch_path) == 3
+    assert utf16.read_text(encoding="utf-16") == path.read_text(encoding="utf-8-sig")
+
+
+def test_unencodable_values_are_skipped(tmp_path, capsys):
+    path = tmp_path / "global.ini"
+    path.write_bytes("a=caf\xe9\nb=old\n".encode("latin-1"))
+    ini = map_ini(path, use_cache=False)
+    assert ini.encoding == "latin-1"
+
+    changes = save_patched_ini(ini, {"a": "Caf\xe9™", "b": "new"}, path, patch_path=None)
+    assert [c["key"] for c in changes] == ["b"]
+    assert path.read_bytes() == "a=caf\xe9\nb=new\n".encode("latin-1")
+    assert "Skipping a" in capsys.readouterr().out
+
+
+def test_audit_results_are_matched_to_the_loaded_ini(tmp_path):
+    path = tmp_path / "global.ini"
+    path.write_bytes(SOURCE)
+    artifact = tmp_path / "audit_results.json"
+    results = {"resolved": [{"key": "c", "fix": "M3B Guardian"}], "total_components": 1, "placeholders_ignored": 0}
+    with map_ini(path, use_cache=False) as ini:
+        write_audit_results(results, path, ini, artifact)
+
+    # Touched but identical: the digest of the loaded buffer still matches
+    os.utime(path, ns=(1, 1))
+    with map_ini(path, use_cache=False) as ini:
+        loaded = load_audit_results(path, ini, artifact)
+    assert [(r["key"], r["offset"], r["length"]) for r in loaded["resolved"]] == [("c", SOURCE.index(b"Guardian"), 8)]
+
+    path.write_bytes(SOURCE.replace(b"Guardian", b"Guardien"))
+    with map_ini(path, use_cache=False) as ini:
+        assert load_audit_results(path, ini, artifact) is None
+
+
+def test_summary_counts_only_written_updates(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "global.ini"
+    path.write_bytes("a=caf\xe9\nb=old\n".encode("latin-1"))
+    results = {"placeholders_ignored": 0, "resolved": [
+        {"key": "a", "actual": "caf\xe9", "fix": "Caf\xe9™"}, {"key": "b", "actual": "old", "fix": "new"}]}
+    with map_ini(path, use_cache=False) as ini:
+        apply_fixes(tmp_path, ini, path, results=results)
+
+    assert path.read_bytes() == "a=caf\xe9\nb=new\n".encode("latin-1")
+    assert "Updates Applied: 1" in capsys.readouterr().out
@@ -0,0 +1,142 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import customStrings
+from conftest import TARGET_STRINGS
+from customStrings import LiveMerge, merge_ini_stream, sync_overrides, watch
+from ini_index import load_ini, parse_ini_bytes, sniff_encoding
+
+
+def batch_merge(tmp_path, source_path, overrides):
+    """Text a normal (non-watch) build writes for the same inputs."""
+    encoding = sniff_encoding(source_path)
+    merged = tmp_path / "merged.ini"
+    merge_ini_stream(source_path, merged, overrides, encoding)
+    return merged.read_text(encoding=encoding)
+
+
+def edit_sequence(overrides, source):
+    """Successive override sets, as saved one after another in the editor."""
+    keys = [k for k in overrides if k in source]
+    yield dict(overrides)
+    edited = dict(overrides)
+    edited[keys[0]] = "edited value"
+    yield dict(edited)
+    edited["brand_new_key"] = "appended"
+    yield dict(edited)
+    extra = next(k for k in source if k not in edited)
+    edited[extra] = "now overridden"
+    yield dict(edited)
+    del edited[keys[1]]
+    yield dict(edited)
+    del edited["brand_new_key"]
+    yield dict(edited)
+    yield {}
+
+
+def check_live_matches_batch(tmp_path, source_path, overrides):
+    live = LiveMerge(load_ini(source_path, use_cache=False))
+    for step in edit_sequence(overrides, live.source):
+        live.update(step)
+        assert live.render_text() == batch_merge(tmp_path, source_path, step)
+
+
+def test_live_merge_matches_batch_merge_with_duplicates(tmp_path):
+    source_path = tmp_path / "global.ini"
+    source_path.write_bytes(
+        b"\xef\xbb\xbf;comment=not a key\r\n"
+        b"a=1\r\n"
+        b"b = 2\r\n"
+        b"dup=first\r\n"
+        b"c=3\r\n"
+        b"dup=second\r\n"
+        b"\r\n"
+        b"d=\xc2\xa0padded\xc2\xa0\r\n"
+    )
+    overrides = {"dup": "merged", "a": "one", "d": "four"}
+    check_live_matches_batch(tmp_path, source_path, overrides)
+
+    live = LiveMerge(load_ini(source_path, use_cache=False))
+    live.update(overrides)
+    assert live.render_text().count("dup=merged") == 2
+
+
+def test_live_merge_matches_batch_merge_on_real_files(tmp_path, global_ini_bytes):
+    source_path = tmp_path / "global.ini"
+    source_path.write_bytes(global_ini_bytes)
+    overrides = dict(load_ini(TARGET_STRINGS, use_cache=False).items())
+    check_live_matches_batch(tmp_path, source_path, overrides)
+
+
+def test_live_merge_reports_changed_keys():
+    live = LiveMerge(parse_ini_bytes(b"a=1\nb=2\n"))
+    assert live.update({"a": "x"}) == ["a"]
+    assert live.update({"a": "x"}) == []
+    assert sorted(live.update({"b": "y"})) == ["a", "b"]
+    assert live.render_text() == "a=1\nb=y"
+
+
+def test_stream_merge_replaces_stray_bytes(tmp_path):
+    source_path = tmp_path / "global.ini"
+    source_path.write_bytes(b"\xef\xbb\xbfa=Caf\xc3\xa9\r\nb=bad\xff\r\nc=3\r\n")
+    assert batch_merge(tmp_path, source_path, {"c": "three"}) == "a=Caf\xe9\nb=bad�\nc=three"
+
+
+def watch_files(tmp_path):
+    global_ini = tmp_path / "global.ini"
+    global_ini.write_bytes(b"\xef\xbb\xbfa=1\r\nb=2\r\n")
+    modified_ini = tmp_path / "target_strings.ini"
+    modified_ini.write_text("a=one\n", encoding="utf-8")
+    return str(global_ini), str(modified_ini), tmp_path / "game"
+
+
+def failing_once(real):
+    calls = []
+
+    def write_and_deploy(*args):
+        calls.append(args)
+        if len(calls) == 1:
+            raise PermissionError("global.ini is locked")
+        return real(*args)
+    return write_and_deploy, calls
+
+
+def test_sync_overrides_retries_after_failed_write(tmp_path, monkeypatch):
+    global_ini, modified_ini, dest_dir = watch_files(tmp_path)
+    live = LiveMerge(load_ini(global_ini, use_cache=False))
+    live.update({"a": "one"})
+    fake, calls = failing_once(customStrings.write_and_deploy)
+    monkeypatch.setattr(customStrings, "write_and_deploy", fake)
+
+    Path(modified_ini).write_text("a=one\nb=two\n", encoding="utf-8")
+    with pytest.raises(PermissionError):
+        sync_overrides(live, modified_ini, global_ini, dest_dir)
+    assert live.overrides == {"a": "one"}  # rolled back
+
+    assert sync_overrides(live, modified_ini, global_ini, dest_dir) == ["b"]
+    assert len(calls) == 2
+    assert (dest_dir / "global.ini").read_text(encoding="utf-8-sig") == "a=one\nb=two"
+
+
+def test_watch_deploys_a_save_whose_first_write_failed(tmp_path, monkeypatch):
+    global_ini, modified_ini, dest_dir = watch_files(tmp_path)
+    fake, calls = failing_once(customStrings.write_and_deploy)
+    monkeypatch.setattr(customStrings, "write_and_deploy", fake)
+
+    polls = []
+
+    def sleep(seconds):
+        polls.append(seconds)
+        if len(polls) == 1:
+            # Saved in the editor while watching
+            Path(modified_ini).write_text("a=one\nb=two\n", encoding="utf-8")
+            os.utime(modified_ini, ns=(1, 1))
+        elif len(polls) > 5:
+            raise KeyboardInterrupt
+    monkeypatch.setattr(customStrings.time, "sleep", sleep)
+
+    watch(global_ini, modified_ini, dest_dir)
+    assert len(calls) == 2
+    assert (dest_dir / "global.ini").read_text(encoding="utf-8-sig") == "a=one\nb=two"
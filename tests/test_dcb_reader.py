@@ -0,0 +1,189 @@
+import struct
+import uuid
+
+import pytest
+
+from audit_sc_native import component_from_record, read_components_from_dcb
+from dcb_reader import (CLASS, ENUM_CHOICE, HEADER, INT32, LOCALE, NO_INDEX, STRONG_POINTER, DataCore,
+                        DataCoreError)
+
+# name, parent, [(property, data type, conversion (0 = value, 1 = array), structure index)]
+STRUCTS = [
+    ("SCItemLocalization", None, [("Name", LOCALE, 0, 0), ("ShortName", LOCALE, 0, 0), ("Description", LOCALE, 0, 0)]),
+    ("SItemDefinition", None, [("Type", ENUM_CHOICE, 0, 0), ("Size", INT32, 0, 0), ("Grade", INT32, 0, 0),
+                               ("Localization", CLASS, 0, 0)]),
+    ("SAttachableComponentParams", None, [("AttachDef", CLASS, 0, 1)]),
+    ("EntityClassDefinition", None, [("Components", STRONG_POINTER, 1, 0)]),
+]
+LOC, ITEM, ATTACH, ENTITY = range(4)
+
+# record name, file name, AttachDef type, size, grade, name token, short name token
+ITEMS = [
+    ("COOL_A", "libs/foundry/records/entities/scitem/ships/cooler/cool_a.xml", "Cooler", 1, 2, "@item_NameCool_A", ""),
+    ("GUN_B", "libs/foundry/records/entities/scitem/ships/weapons/gun_b.xml", "WeaponGun", 3, 1,
+     "@item_NameGun_B", "@item_NameGun_B_short"),
+    ("PAINT", "libs/foundry/records/entities/scitem/ships/paints/paint.xml", "Paints", 1, 1, "@item_NamePaint", ""),
+    ("NO_TOKEN", "libs/foundry/records/entities/scitem/ships/cooler/no_token.xml", "Cooler", 1, 1, "Cooler", ""),
+    ("OTHER", "libs/foundry/records/entities/other/ships/cooler/other.xml", "Cooler", 2, 1, "@item_NameOther", ""),
+]
+
+
+class Strings:
+    """A string table: each string is stored once, NUL-terminated, and referenced by offset."""
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def __call__(self, text):
+        if text not in self.offsets:
+            self.offsets[text] = len(self.data)
+            self.data += text.encode("utf-8") + b"\0"
+        return self.offsets[text]
+
+
+def build_dcb(items=ITEMS):
+    """A version 6 DataCore holding one EntityClassDefinition record per item."""
+    text, names = Strings(), Strings()
+    instances = {index: [] for index in range(len(STRUCTS))}
+    strong_values = []
+    records = []
+
+    for record_name, filename, comp_type, size, grade, name, short_name in items:
+        loc = struct.pack("<III", text(name), text(short_name), text(f"@item_Desc{record_name}"))
+        item = struct.pack("<Iii", text(comp_type), size, grade) + loc
+        instances[ATTACH].append(item)
+        strong_values.append((ATTACH, len(instances[ATTACH]) - 1))
+        instances[ENTITY].append(struct.pack("<II", 1, len(strong_values) - 1))
+        records.append(struct.pack("<III16sHH", names(f"EntityClassDefinition.{record_name}"), text(filename),
+                                   ENTITY, uuid.uuid4().bytes, len(instances[ENTITY]) - 1, 8))
+
+    struct_defs, property_defs = bytearray(), bytearray()
+    property_count = 0
+    for name, parent, props in STRUCTS:
+        struct_defs += struct.pack("<IIHHI", names(name), NO_INDEX if parent is None else parent,
+                                   len(props), property_count, 0)
+        for prop_name, data_type, conversion, index in props:
+            property_defs += struct.pack("<IHHHH", names(prop_name), index, data_type, conversion, 0)
+        property_count += len(props)
+
+    mappings = [(len(data), index) for index, data in instances.items() if data]
+    value_counts = [0] * 19
+    value_counts[15] = len(strong_values)
+    body = (bytes(struct_defs) + bytes(property_defs)
+            + b"".join(struct.pack("<II", *m) for m in mappings)
+            + b"".join(records)
+            + b"".join(struct.pack("<II", *v) for v in strong_values))
+    instance_data = b"".join(b"".join(instances[index]) for _, index in mappings)
+    header = HEADER.pack(0, 6, 0, 0, 0, 0, len(STRUCTS), property_count, 0, len(mappings), len(records),
+                         *value_counts, len(text.data), len(names.data))
+    return header + body + bytes(text.data) + bytes(names.data) + instance_data
+
+
+@pytest.fixture
+def dcb_path(tmp_path):
+    path = tmp_path / "Game2.dcb"
+    path.write_bytes(build_dcb())
+    return path
+
+
+def test_records_and_instances(dcb_path):
+    with DataCore(dcb_path) as dcb:
+        assert dcb.version == 6
+        records = list(dcb.records("EntityClassDefinition"))
+        assert [r.name for r in records] == [f"EntityClassDefinition.{item[0]}" for item in ITEMS]
+        assert records[0].filename == ITEMS[0][1]
+
+        attach = records[1].instance["Components"][0]["AttachDef"]
+        assert (attach["Type"], attach["Size"], attach["Grade"]) == ("WeaponGun", 3, 1)
+        assert attach["Localization"]["ShortName"] == "@item_NameGun_B_short"
+        assert list(dcb.records("NoSuchStructure")) == []
+
+
+def test_read_components_from_dcb(dcb_path):
+    components = read_components_from_dcb(dcb_path)
+    assert [(c.type, c.size, c.grade, c.token, c.short_token) for c in components] == [
+        ("Cooler", 1, "B", "@item_NameCool_A", ""),
+        ("WeaponGun", 3, "A", "@item_NameGun_B", "@item_NameGun_B_short"),
+    ]
+    assert components[0].description_token == "@item_DescCOOL_A"
+
+
+def test_component_from_record_skips_items_without_rule_or_token(dcb_path):
+    with DataCore(dcb_path) as dcb:
+        records = {r.name.split(".")[1]: r for r in dcb.records("EntityClassDefinition")}
+        assert component_from_record(records["PAINT"]) is None
+        assert component_from_record(records["NO_TOKEN"]) is None
+        assert component_from_record(records["OTHER"]).token == "@item_NameOther"
+
+
+def test_header_validation(tmp_path):
+    data = build_dcb()
+    path = tmp_path / "Game2.dcb"
+
+    path.write_bytes(data[:HEADER.size - 1])
+    with pytest.raises(DataCoreError):
+        DataCore(path)
+
+    path.write_bytes(data[:4] + struct.pack("<I", 4) + data[8:])
+    with pytest.raises(DataCoreError, match="version 4"):
+        DataCore(path)
+
+    path.write_bytes(b"")
+    with pytest.raises(DataCoreError, match="empty"):
+        DataCore(path)
+
+
+@pytest.mark.parametrize("change", [b"\0", b"\0" * 16])
+def test_size_sum_validation(tmp_path, change):
+    path = tmp_path / "Game2.dcb"
+    path.write_bytes(build_dcb() + change)
+    with pytest.raises(DataCoreError, match="do not add up"):
+        DataCore(path)
+    path.write_bytes(build_dcb()[:-len(change)])
+    with pytest.raises(DataCoreError, match="do not add up"):
+        DataCore(path)
+
+
+def test_corrupt_instance_data_raises_datacore_error(dcb_path):
+    with DataCore(dcb_path) as dcb:
+        pointer_table = dcb.values[STRONG_POINTER][0]
+        entity = dcb.instance(ENTITY, 1).offset
+    data = bytearray(dcb_path.read_bytes())
+    # A strong pointer to a structure index past the table
+    struct.pack_into("<II", data, pointer_table, 99, 0)
+    # An array whose items lie past the end of the file
+    struct.pack_into("<II", data, entity, 1, 1 << 20)
+
+    path = dcb_path.with_name("corrupt.dcb")
+    path.write_bytes(bytes(data))
+    with pytest.raises(DataCoreError):
+        read_components_from_dcb(path)
+    with DataCore(path) as dcb:
+        records = list(dcb.records("EntityClassDefinition"))
+        with pytest.raises(DataCoreError, match="IndexError"):
+            records[0].instance["Components"]
+        with pytest.raises(DataCoreError, match="corrupt table data"):
+            records[1].instance["Components"]
+
+
+def test_corrupt_property_table_raises_datacore_error(tmp_path):
+    # Point the AttachDef property of SAttachableComponentParams at a structure that does not exist
+    data = bytearray(build_dcb())
+    property_table = HEADER.size + len(STRUCTS) * 16
+    attach_def = property_table + 7 * 12  # 3 + 4 properties before it
+    struct.pack_into("<H", data, attach_def + 4, 200)
+
+    path = tmp_path / "corrupt.dcb"
+    path.write_bytes(bytes(data))
+    with pytest.raises(DataCoreError):
+        read_components_from_dcb(path)
+
+
+def test_inheritance_cycle_raises_datacore_error(tmp_path):
+    data = bytearray(build_dcb())
+    struct.pack_into("<I", data, HEADER.size + LOC * 16 + 4, LOC)  # SCItemLocalization inherits from itself
+
+    path = tmp_path / "cycle.dcb"
+    path.write_bytes(bytes(data))
+    with pytest.raises(DataCoreError, match="inherits from itself"):
+        DataCore(path)
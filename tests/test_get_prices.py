@@ -0,0 +1,152 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import getPrices
+from getPrices import build_price_index, compact_name, fetch_json, find_price, name_variant, normalize_name
+
+
+def price_index(*names):
+    return build_price_index([{"name": name, "price": 1, "illegal": False} for name in names])
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("E'tam", "e tam"),
+    ("  Gasping   Weevil-Eggs ", "gasping weevil eggs"),
+    ("SLAM", "slam"),
+    ("Ｑuartz", "quartz"),  # NFKC folds full-width letters
+])
+def test_normalize_name(name, expected):
+    assert normalize_name(name) == expected
+
+
+def test_compact_name_keeps_the_qualifier():
+    assert compact_name("Agricium (Ore)") == "agriciumore"
+    assert name_variant("Agricium (Ore)") == "ore"
+    assert name_variant("Agricium") == ""
+
+
+def test_find_price_exact_normalized_and_compact():
+    index = price_index("E'tam", "Gasping Weevil Eggs", "Medical Supplies")
+    assert find_price(index, "e'TAM")["name"] == "E'tam"
+    assert find_price(index, "E tam")["name"] == "E'tam"
+    assert find_price(index, "GaspingWeevilEggs")["name"] == "Gasping Weevil Eggs"
+    assert find_price(index, "Medical Suplies")["name"] == "Medical Supplies"
+
+
+@pytest.mark.parametrize("prices, name", [
+    (("Quantainium",), "Quantainium (Raw)"),
+    (("Quantainium (Raw)",), "Quantainium"),
+    (("Agricium (Ore)",), "Agricium"),
+    (("Agricium",), "Agricium (Ore)"),
+    (("Beryl (Raw)",), "Beryl (Ore)"),
+])
+def test_find_price_does_not_cross_raw_and_refined(prices, name):
+    assert find_price(price_index(*prices), name) is None
+
+
+def test_find_price_rejects_ambiguous_fuzzy_matches():
+    # "Hydrogen Fuell" is about as close to both names: no clear winner
+    assert find_price(price_index("Hydrogen Fuel", "Hydrogen Fuels"), "Hydrogen Fuell") is None
+    assert find_price(price_index("Hydrogen Fuel"), "Hydrogen Fuell")["name"] == "Hydrogen Fuel"
+
+
+def test_find_price_rejects_ambiguous_compact_names():
+    index = price_index("Iron Ore", "IronOre")
+    assert find_price(index, "Iron-Ore")["name"] == "Iron Ore"  # normalized match is still exact
+    assert find_price(index, "I ronOre") is None
+
+
+class StubApi(ThreadingHTTPServer):
+    """UEX stand-in: serves self.responses in turn, answering If-None-Match with 304."""
+    etag = '"v1"'
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.responses = []
+        self.requests = []
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        api = self.server
+        api.requests.append(dict(self.headers))
+        status, delay = api.responses.pop(0) if api.responses else (200, 0)
+        threading.Event().wait(delay)
+        if status == 200 and self.headers.get("If-None-Match") == api.etag:
+            status = 304
+        body = json.dumps({"data": COMMODITIES}).encode() if status == 200 else b""
+        self.send_response(status)
+        self.send_header("ETag", api.etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+COMMODITIES = [{"name": "Agricium", "price_sell": 2500, "is_illegal": 0}]
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setattr(getPrices, "SNAPSHOT_DIR", tmp_path / "prices")
+    monkeypatch.setattr(getPrices, "HISTORY_DB", tmp_path / "prices" / "history.sqlite3")
+    monkeypatch.setattr(getPrices, "REQUEST_TIMEOUT", 0.5)
+    monkeypatch.setattr(getPrices.time, "sleep", lambda seconds: None)
+    server = StubApi()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}/commodities/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_retries_then_serves_from_the_snapshot(api):
+    server, url = api
+    server.responses = [(500, 0), (200, 1)]  # a server error, then a response slower than the timeout
+    assert fetch_json("commodities", url, ttl=60) == {"data": COMMODITIES}
+    assert len(server.requests) == 3
+    assert len(getPrices.snapshot_paths("commodities")) == 1
+
+    # Fresh within the TTL: no request at all
+    assert fetch_json("commodities", url, ttl=60) == {"data": COMMODITIES}
+    assert len(server.requests) == 3
+
+    # Past the TTL: revalidated with the stored ETag, the 304 keeps the snapshot
+    path, snapshot = getPrices.latest_snapshot("commodities")
+    assert fetch_json("commodities", url, ttl=0) == {"data": COMMODITIES}
+    assert server.requests[-1]["If-None-Match"] == StubApi.etag
+    assert getPrices.load_snapshot(path)["validated_at"] > snapshot["validated_at"]
+    assert getPrices.snapshot_paths("commodities") == [path]
+
+
+def test_fetch_falls_back_to_the_snapshot_when_every_retry_fails(api):
+    server, url = api
+    fetch_json("commodities", url, ttl=0)
+    server.responses = [(503, 0)] * getPrices.RETRIES
+    assert fetch_json("commodities", url, ttl=0) == {"data": COMMODITIES}
+    assert len(server.requests) == 1 + getPrices.RETRIES
+
+    server.responses = [(503, 0)] * getPrices.RETRIES
+    with pytest.raises(requests.HTTPError):
+        fetch_json("other", url, ttl=0)
+
+
+def test_offline_uses_the_latest_snapshot_without_a_request(api):
+    server, url = api
+    with pytest.raises(RuntimeError, match="offline mode"):
+        fetch_json("commodities", url, offline=True)
+    fetch_json("commodities", url)
+    assert fetch_json("commodities", url, ttl=0, offline=True) == {"data": COMMODITIES}
+    assert len(server.requests) == 1
+
+    db = getPrices.open_history()
+    try:
+        assert getPrices.price_statistics(db, "latest") == {"Agricium": 2500}
+    finally:
+        db.close()
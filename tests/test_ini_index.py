@@ -0,0 +1,164 @@
+import os
+
+import pytest
+
+import ini_cache
+from ini_index import IniIndex, MappedIni, detect_encoding, load_ini, map_ini, parse_ini_bytes
+
+
+def baseline_parse(path, encoding):
+    """The line-by-line parse the scripts used before the shared index."""
+    data = {}
+    with open(path, "r", encoding=encoding) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(";") or line.startswith("#"):
+                continue
+            if "=" in line:
+                key, value = line.split("=", 1)
+                data[key.strip()] = value.strip()
+    return data
+
+
+@pytest.mark.parametrize("codec, baseline_encoding", [
+    ("utf-8-sig", "utf-8-sig"),  # as shipped (the old parse kept the BOM on the first key)
+    ("utf-8", "utf-8"),
+    ("utf-16", "utf-16"),
+])
+def test_parity_with_baseline_parse(tmp_path, global_ini_bytes, codec, baseline_encoding):
+    ini_path = tmp_path / "global.ini"
+    ini_path.write_bytes(global_ini_bytes.decode("utf-8-sig").encode(codec))
+
+    expected = baseline_parse(ini_path, baseline_encoding)
+    assert len(expected) > 80000
+    for loader in (load_ini, map_ini):
+        ini = loader(ini_path, use_cache=False)
+        assert dict(ini.items()) == expected
+        ini.close()
+
+
+def test_values_are_stripped_like_str_strip():
+    data = "a=  leading\nb=trailing \nc=  both  \nd= \ne= in side \n".encode("utf-8")
+    ini = parse_ini_bytes(data)
+    assert dict(ini.items()) == {"a": "leading", "b": "trailing", "c": "both", "d": "", "e": "in side"}
+
+
+def test_latin1_values_are_stripped():
+    ini = parse_ini_bytes("k=caf\xe9\xa0\n".encode("latin-1"))
+    assert ini.encoding == "latin-1"
+    assert ini["k"] == "caf\xe9"
+
+
+def test_raw_span_covers_whitespace_around_value():
+    data = b"a=  x \r\nb=y\n"
+    ini = parse_ini_bytes(data)
+    offset, length = ini.span("a")
+    assert data[offset:offset + length] == b"x"
+    offset, length = ini.raw_span("a")
+    assert data[offset:offset + length] == b"  x "
+    offset, length = ini.raw_span("b")
+    assert data[offset:offset + length] == b"y"
+
+
+def test_comments_blanks_and_duplicates():
+    ini = parse_ini_bytes(b"\xef\xbb\xbf;c=1\n#d=2\n\nk=first\nk=last\n")
+    assert ini.bom == b"\xef\xbb\xbf"
+    assert dict(ini.items()) == {"k": "last"}
+    assert ini.line_numbers() == {"k": 4}
+
+
+def test_map_ini_matches_load_ini(tmp_path):
+    ini_path = tmp_path / "global.ini"
+    ini_path.write_bytes(b"\xef\xbb\xbfa=1\r\nb = two \r\n")
+    mapped = map_ini(ini_path, use_cache=False)
+    assert isinstance(mapped, MappedIni)
+    assert dict(mapped.items()) == dict(load_ini(ini_path, use_cache=False).items()) == {"a": "1", "b": "two"}
+    assert mapped.output_encoding == "utf-8-sig"
+    mapped.close()
+
+
+def test_map_ini_utf16_and_empty_files(tmp_path):
+    utf16 = tmp_path / "utf16.ini"
+    utf16.write_text("a=1\nb=2\n", encoding="utf-16")
+    ini = map_ini(utf16)
+    assert not isinstance(ini, MappedIni)
+    assert dict(ini.items()) == {"a": "1", "b": "2"}
+    assert ini.output_encoding == "utf-16"
+
+    empty = tmp_path / "empty.ini"
+    empty.write_bytes(b"")
+    assert len(map_ini(empty)) == 0
+
+
+def _cache_entry(ini_path):
+    data = ini_path.read_bytes()
+    return ini_cache.lookup(ini_path, os.stat(ini_path), data)
+
+
+def test_cache_round_trip(tmp_path):
+    ini_path = tmp_path / "global.ini"
+    ini_path.write_bytes(b"a=1\nb= 2\n")
+    first = load_ini(ini_path)
+    entry = _cache_entry(ini_path)
+    assert entry is not None
+    encoding, bom_length, keys, offsets, lengths = entry
+    assert (encoding, bom_length) == ("utf-8", 0)
+    assert (keys, offsets, lengths) == tuple(first.index())
+
+    # A fresh process reads the index from the cache and decodes the same values
+    cached = IniIndex(ini_path.read_bytes(), encoding, b"", ini_path, (keys, offsets, lengths))
+    assert dict(cached.items()) == {"a": "1", "b": "2"}
+
+
+def test_cache_rejects_other_header_or_changed_file(tmp_path):
+    ini_path = tmp_path / "global.ini"
+    ini_path.write_bytes(b"a=1\n")
+    load_ini(ini_path)
+    entry_path = ini_cache.cache_path(ini_path)
+    raw = entry_path.read_bytes()
+
+    # Entry written by an older index layout
+    entry_path.write_bytes(b"SCINIDX1" + raw[8:])
+    assert _cache_entry(ini_path) is None
+
+    # Same size, different content and mtime
+    entry_path.write_bytes(raw)
+    ini_path.write_bytes(b"a=2\n")
+    os.utime(ini_path, ns=(1, 1))
+    assert _cache_entry(ini_path) is None
+
+
+def test_cache_survives_touch_with_same_content(tmp_path):
+    ini_path = tmp_path / "global.ini"
+    ini_path.write_bytes(b"a=1\n")
+    load_ini(ini_path)
+    os.utime(ini_path, ns=(10 ** 18, 10 ** 18))
+    assert _cache_entry(ini_path) is not None
+
+
+def test_eviction_keeps_newest_versions(tmp_path):
+    paths = {}
+    for version in ("4.1.0", "4.2.0", "4.3.0", "4.4.0", None):
+        folder = tmp_path / version if version else tmp_path / "misc"
+        folder.mkdir()
+        ini_path = folder / "global.ini"
+        ini_path.write_bytes(b"a=1\n")
+        load_ini(ini_path)
+        paths[version] = ini_cache.cache_path(ini_path)
+
+    ini_cache.evict(keep_versions=3)
+    assert not paths["4.1.0"].exists()
+    assert all(paths[v].exists() for v in ("4.2.0", "4.3.0", "4.4.0", None))
+
+
+def test_stray_byte_keeps_utf8():
+    ini = parse_ini_bytes(b"a=Caf\xc3\xa9 \xe2\x84\xa2\nb=bad\xff\n")
+    assert ini.encoding == "utf-8"
+    assert dict(ini.items()) == {"a": "Caf\xe9 ™", "b": "bad�"}
+
+
+def test_stray_byte_across_scan_chunks(monkeypatch):
+    monkeypatch.setattr("ini_index.SCAN_CHUNK", 4)
+    data = b"a=\xc3\xa9\xc3\xa9\xc3\xa9\nb=x\xff\n"  # sequences split over chunk edges
+    assert detect_encoding(data) == ("utf-8", 0)
+    assert detect_encoding("a=caf\xe9 na\xefve\n".encode("latin-1")) == ("latin-1", 0)
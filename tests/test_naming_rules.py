@@ -0,0 +1,121 @@
+import re
+
+from audit_sc_native import audit_language_pack, build_component
+from component_index import build_manifest
+from naming_rules import RULES, manifest_layout, rule_for
+
+
+def baseline_extract(attach_attrs, loc_attrs):
+    """(type, size, grade, name token) as the hard-coded extract_component_from_xml built it."""
+    comp_type = attach_attrs.get("Type")
+    if comp_type not in ["Cooler", "PowerPlant", "Shield", "QuantumDrive"]:
+        return None
+    size_str, grade_val = attach_attrs.get("Size"), attach_attrs.get("Grade")
+    if not size_str or not grade_val:
+        return None
+    try:
+        size = int(size_str)
+    except ValueError:
+        return None
+    grade = {"1": "A", "2": "B", "3": "C", "4": "D"}.get(grade_val, grade_val)
+    name_token = loc_attrs.get("Name")
+    if not name_token or not name_token.startswith("@"):
+        return None
+    return comp_type, size, grade, name_token
+
+
+def baseline_audit(components, lang_pack):
+    """(mismatched keys, fixes, missing tokens) as the hard-coded audit and fixer produced them."""
+    prefixes = {'Military': 'M', 'Civilian': 'C', 'Industrial': 'I', 'Stealth': 'S', 'Competition': 'R'}
+    mismatches, fixes, missing = [], {}, []
+    for comp in components:
+        class_match = re.search(r"Class:\s*(\w+)", lang_pack.get(comp.description_token.lstrip('@'), ""), re.IGNORECASE)
+        item_class = class_match.group(1).capitalize() if class_match else "Unknown"
+        code = f"{prefixes.get(item_class, 'C')}{comp.size}{comp.grade}"
+        key = comp.token.lstrip('@')
+        actual = lang_pack.get(key)
+        if actual and "PLACEHOLDER" in actual:
+            continue
+        if not actual:
+            missing.append(comp.token)
+            continue
+        if not actual.startswith(code):
+            mismatches.append(key)
+        match = re.match(r"^([A-Z][0-9][A-Z])\s+(.*)", actual.strip())
+        new_value = f"{code} {match.group(2) if match else actual.strip()}"
+        if new_value != actual.strip():
+            fixes[key] = new_value
+    return mismatches, fixes, missing
+
+
+SAMPLES = [
+    ({"Type": "Cooler", "Size": "1", "Grade": "1"}, {"Name": "@item_NameCool_A", "Description": "@item_DescCool_A"}),
+    ({"Type": "PowerPlant", "Size": "2", "Grade": "C"}, {"Name": "@item_NamePowr_B", "Description": "@item_DescPowr_B"}),
+    ({"Type": "Shield", "Size": "3", "Grade": "2"}, {"Name": "@item_NameShld_C", "Description": "@item_DescShld_C"}),
+    ({"Type": "QuantumDrive", "Size": "1", "Grade": "4"}, {"Name": "@item_NameQdrv_D", "Description": "@item_DescQdrv_D"}),
+    ({"Type": "Cooler", "Size": "2", "Grade": "1"}, {"Name": "@item_NameCool_Missing"}),
+    ({"Type": "Shield", "Size": "1", "Grade": "1"}, {"Name": "@item_NameShld_Placeholder"}),
+    ({"Type": "Shield", "Size": "", "Grade": "1"}, {"Name": "@item_NameShld_NoSize"}),
+    ({"Type": "Cooler", "Size": "x", "Grade": "1"}, {"Name": "@item_NameCool_BadSize"}),
+    ({"Type": "Cooler", "Size": "1", "Grade": "1"}, {"Name": "item_NameCool_NoAt"}),
+    ({"Type": "Radar", "Size": "1", "Grade": "1"}, {"Name": "@item_NameRadar"}),
+    ({"Type": "Missile", "Size": "3"}, {"Name": "@item_NameMissile"}),
+    ({"Type": "WeaponMining", "Size": "1"}, {"Name": "@item_NameMiningHead"}),
+    ({"Type": "WeaponPersonal", "Size": "1"}, {"Name": "@item_NameRifle"}),
+]
+
+LANG_PACK = {
+    "item_NameCool_A": "C1A Frost",              # correct
+    "item_DescCool_A": "Class: Civilian",
+    "item_NamePowr_B": "M2C PowerBolt",          # wrong class
+    "item_DescPowr_B": "Class: Industrial",
+    "item_NameShld_C": "Guardian",               # no code at all
+    "item_DescShld_C": "Class: military",
+    "item_NameQdrv_D": "S1D Drift ",             # trailing space
+    "item_DescQdrv_D": "Class: Stealth",
+    "item_NameShld_Placeholder": "PLACEHOLDER",
+}
+
+
+def test_rules_cover_only_the_enforced_item_types():
+    assert {t for rule in RULES for t in rule.types} == {"Cooler", "PowerPlant", "Shield", "QuantumDrive", "WeaponGun"}
+
+
+def test_rules_reproduce_the_hard_coded_audit():
+    components = []
+    for attach_attrs, loc_attrs in SAMPLES:
+        component = build_component(attach_attrs, loc_attrs)
+        expected = baseline_extract(attach_attrs, loc_attrs)
+        assert (component and (component.type, component.size, component.grade, component.token)) == expected
+        if component:
+            components.append(component)
+
+    results = audit_language_pack(components, "global.ini", LANG_PACK)
+    mismatches, fixes, missing = baseline_audit(components, LANG_PACK)
+    assert [m['key'] for m in results['mismatches']] == mismatches == ["item_NamePowr_B", "item_NameShld_C"]
+    assert {r['key']: r['fix'] for r in results['resolved'] if r['fix'] != r['actual'].strip()} == fixes
+    assert [m['component'] for m in results['missing']] == missing
+    assert results['placeholders_ignored'] == 1
+
+
+def test_ship_weapon_rule_uses_size_suffix():
+    component = build_component({"Type": "WeaponGun", "Size": "3"},
+                                {"Name": "@item_NameGun", "ShortName": "@item_NameGun_short"})
+    rule = rule_for("WeaponGun")
+    assert rule.tokens(component) == ["@item_NameGun", "@item_NameGun_short"]
+    assert rule.apply("Omnisky VI Cannon S2", rule.code(component)) == "Omnisky VI Cannon S3"
+
+
+def test_manifest_only_lists_ship_weapon_directories(tmp_path):
+    scitem = tmp_path / "libs" / "foundry" / "records" / "entities" / "scitem"
+    for rel in ("ships/weapons/amrs/gun.xml", "ships/cooler/cool.xml", "weapons/fps/rifle.xml", "ships/turret/t.xml"):
+        (scitem / rel).parent.mkdir(parents=True, exist_ok=True)
+        (scitem / rel).write_text("<x/>")
+
+    dirs, keywords = manifest_layout()
+    manifest = build_manifest(tmp_path / "libs", scitem, dirs, keywords)
+    assert manifest["components"] == {
+        "ship_component": ["ships/cooler/cool.xml"],
+        "ship_weapon": ["ships/weapons/amrs/gun.xml"],
+    }
+    assert manifest["xml_count"] == 4
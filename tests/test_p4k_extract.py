@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+
+import pytest
+
+from p4k_extract import P4kTarget, common_filter, extract_target, plan_filters, run_tool
+
+# Stand-in for unp4k: the "archive" is a JSON file of {path: content} plus options.
+# Files whose path contains the filter are written to the working directory and
+# reported as "method | crypto | path" lines (or an unparseable line when quiet).
+STAND_IN = '''
+import json, sys, time
+from pathlib import Path
+
+archive = json.loads(Path(sys.argv[1]).read_text())
+pattern = sys.argv[2].lower()
+time.sleep(archive.get("delay", 0))
+if pattern in archive.get("fail", []):
+    print("Error: cannot open archive")
+    sys.exit(3)
+for name, content in archive["files"].items():
+    if pattern in name.lower():
+        out = Path(name)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(content)
+        print("extracting..." if archive.get("quiet") else f"Deflated | Plain | {name}")
+'''
+
+DCB = ["Data/Game2.dcb", "Data/Game.dcb"]
+
+
+@pytest.fixture
+def tool(tmp_path):
+    script = tmp_path / "unp4k.py"
+    script.write_text(STAND_IN)
+    return [sys.executable, str(script)]
+
+
+def archive(tmp_path, files, **options):
+    path = tmp_path / "Data.p4k"
+    path.write_text(json.dumps({"files": files, **options}))
+    return path
+
+
+@pytest.mark.parametrize("candidates, expected", [
+    (DCB, ".dcb"),
+    (["Data/Localization/english/global.ini", "Data/Libs/Localization/english/global.ini"],
+     "/localization/english/global.ini"),
+    (["Data/a.xml", "Data/b.xml"], ".xml"),
+    (["Data/a.py", "Data/b.py"], None),  # ".py" is below MIN_FILTER
+    (["Data/x.txt", "Data/y.bin"], None),
+])
+def test_common_filter(candidates, expected):
+    assert common_filter(candidates) == expected
+
+
+def test_plan_filters(tmp_path):
+    assert plan_filters(P4kTarget("dcb", DCB, tmp_path)) == [".dcb"]
+    assert plan_filters(P4kTarget("one", ["Data/Game2.dcb"], tmp_path)) == ["Data/Game2.dcb"]
+    assert plan_filters(P4kTarget("mixed", ["Data/x.txt", "Data/y.bin"], tmp_path)) == ["Data/x.txt", "Data/y.bin"]
+
+
+def test_run_tool_reports_each_file(tool, tmp_path):
+    p4k = archive(tmp_path, {"Data/Game2.dcb": "new", "Data/Game.dcb": "old", "Data/global.ini": "a=1"})
+    ok, timings, _ = run_tool(tool, p4k, ".dcb", tmp_path / "out")
+    assert ok and set(timings) == {"Data/Game2.dcb", "Data/Game.dcb"}
+    assert (tmp_path / "out" / "Data" / "Game2.dcb").read_text() == "new"
+
+
+def test_run_tool_failures(tool, tmp_path, capsys):
+    p4k = archive(tmp_path, {"Data/Game2.dcb": "new"}, fail=[".dcb"])
+    assert run_tool(tool, p4k, ".dcb", tmp_path / "out")[0] is False
+    assert "failed with code 3" in capsys.readouterr().out
+
+    p4k = archive(tmp_path, {"Data/Game2.dcb": "new"}, delay=5)
+    ok, _, seconds = run_tool(tool, p4k, ".dcb", tmp_path / "out", timeout=0.5)
+    assert not ok and seconds < 5
+    assert "timed out" in capsys.readouterr().out
+
+    assert run_tool([str(tmp_path / "missing-tool")], p4k, ".dcb", tmp_path / "out")[0] is False
+
+
+@pytest.mark.parametrize("files, expected", [
+    ({"Data/Game2.dcb": "new", "Data/Game.dcb": "old"}, "Data/Game2.dcb"),
+    ({"Data/Game.dcb": "old"}, "Data/Game.dcb"),
+    ({"Data/other.txt": ""}, None),
+])
+def test_extract_target_fallback_order(tool, tmp_path, files, expected):
+    target = P4kTarget("dcb", DCB, tmp_path / "out")
+    path, timings = extract_target(tool, archive(tmp_path, files), target)
+    assert path == (tmp_path / "out" / expected if expected else None)
+    assert [name for name, _ in timings] == ([n for n in files if n.endswith(".dcb")] or [".dcb"])
+
+
+def test_extract_target_tries_the_next_filter_after_a_failed_pass(tool, tmp_path):
+    target = P4kTarget("mixed", ["Data/x.txt", "Data/y.bin"], tmp_path / "out")
+    p4k = archive(tmp_path, {"Data/x.txt": "x", "Data/y.bin": "y"}, fail=["data/x.txt"])
+    path, _ = extract_target(tool, p4k, target)
+    assert path == tmp_path / "out" / "Data" / "y.bin"
+
+
+@pytest.mark.parametrize("quiet", [False, True])
+def test_extract_target_skips_stale_copies(tool, tmp_path, quiet):
+    stale = tmp_path / "out" / "Data" / "Game2.dcb"
+    stale.parent.mkdir(parents=True)
+    stale.write_text("from an older patch")
+    os.utime(stale, (1_000_000, 1_000_000))
+
+    target = P4kTarget("dcb", DCB, tmp_path / "out")
+    path, _ = extract_target(tool, archive(tmp_path, {"Data/Game.dcb": "current"}, quiet=quiet), target)
+    assert path == tmp_path / "out" / "Data" / "Game.dcb"
+
+    # With nothing extracted the stale copy is still not taken
+    (tmp_path / "out" / "Data" / "Game.dcb").unlink()
+    path, _ = extract_target(tool, archive(tmp_path, {}, quiet=quiet), target)
+    assert path is None
@@ -0,0 +1,122 @@
+import struct
+import zipfile
+
+import pytest
+
+from p4k_extract import P4kTarget, extract_native
+from p4k_reader import P4kArchive, P4kError
+
+DCB = bytes(range(256)) * 40
+INI = "\ufeffa=1\r\nb=Omnisky-3 S1\r\n".encode("utf-8") * 200
+
+
+@pytest.fixture
+def p4k(tmp_path, monkeypatch):
+    """Small archive with ZIP64 sizes, offsets and end records, p4k style backslash names."""
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 1 << 10)
+    path = tmp_path / "Data.p4k"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("Data\\Game2.dcb", DCB, compress_type=zipfile.ZIP_STORED)
+        zf.writestr("Data\\Localization\\english\\global.ini", INI, compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+def data_offset(path, name):
+    """Offset of an entry's data (after its local header)."""
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name)
+    header = path.read_bytes()[info.header_offset:info.header_offset + 30]
+    name_length, extra_length = struct.unpack_from("<HH", header, 26)
+    return info.header_offset, info.header_offset + 30 + name_length + extra_length
+
+
+def corrupt(path, offset, value):
+    raw = bytearray(path.read_bytes())
+    raw[offset:offset + len(value)] = value
+    path.write_bytes(bytes(raw))
+
+
+def test_zip64_round_trip(p4k, tmp_path):
+    raw = p4k.read_bytes()
+    assert b"PK\x06\x06" in raw and b"PK\x06\x07" in raw  # ZIP64 end records were written
+
+    with P4kArchive(p4k) as archive:
+        assert archive.count == 2
+        dcb = archive.get("data/GAME2.dcb")
+        ini = archive.first(["Data/Libs/Localization/English/global.ini", "Data/Localization/english/global.ini"])
+        assert (dcb.method, dcb.size) == (zipfile.ZIP_STORED, len(DCB))
+        assert (ini.method, ini.size) == (zipfile.ZIP_DEFLATED, len(INI))
+        assert archive.get("Data/Game.dcb") is None
+        assert archive.read("Data/Game2.dcb") == DCB
+
+        out = archive.extract(ini, tmp_path / "out")
+        assert out == tmp_path / "out" / "Data" / "Localization" / "english" / "global.ini"
+        assert out.read_bytes() == INI
+        assert set(archive.entries()) == {"data/game2.dcb", "data/localization/english/global.ini"}
+
+
+@pytest.fixture
+def cig_p4k(p4k):
+    """The same archive with CIG's PK\\x03\\x14 local header signature, as Data.p4k uses."""
+    for name in ("Data\\Game2.dcb", "Data\\Localization\\english\\global.ini"):
+        header_offset, _ = data_offset(p4k, name)
+        corrupt(p4k, header_offset, b"PK\x03\x14")
+    return p4k
+
+
+def test_cig_local_header_signature(cig_p4k, tmp_path):
+    assert cig_p4k.read_bytes().count(b"PK\x03\x14") == 2
+    with P4kArchive(cig_p4k) as archive:
+        assert archive.read("Data/Game2.dcb") == DCB
+        out = archive.extract(archive.get("Data/Localization/english/global.ini"), tmp_path / "out")
+        assert out.read_bytes() == INI
+
+
+def test_crc_mismatch_removes_partial_file(p4k, tmp_path):
+    _, start = data_offset(p4k, "Data\\Game2.dcb")
+    corrupt(p4k, start + 100, b"\xff")  # DCB[100] is 100
+
+    with P4kArchive(p4k) as archive:
+        entry = archive.get("Data/Game2.dcb")
+        with pytest.raises(P4kError, match="CRC mismatch"):
+            archive.extract(entry, tmp_path / "out")
+    assert not [p for p in (tmp_path / "out").rglob("*") if p.is_file()]  # no .tmp left behind
+
+
+def test_bad_local_header(p4k):
+    header_offset, _ = data_offset(p4k, "Data\\Game2.dcb")
+    corrupt(p4k, header_offset, b"PK\x09\x09")
+
+    with P4kArchive(p4k) as archive:
+        with pytest.raises(P4kError, match="bad local header"):
+            archive.read("Data/Game2.dcb")
+
+
+def test_corrupt_deflate_stream(p4k):
+    _, start = data_offset(p4k, "Data\\Localization\\english\\global.ini")
+    corrupt(p4k, start, b"\xff\xff\xff\xff")
+
+    with P4kArchive(p4k) as archive:
+        with pytest.raises(P4kError, match="corrupt compressed data"):
+            archive.read("Data/Localization/english/global.ini")
+
+
+def test_truncated_archive(p4k, tmp_path):
+    truncated = tmp_path / "truncated.p4k"
+    truncated.write_bytes(p4k.read_bytes()[:-10])
+    with pytest.raises(P4kError):
+        P4kArchive(truncated)
+
+
+def test_extract_native_falls_back_on_corrupt_entries(p4k, tmp_path):
+    _, start = data_offset(p4k, "Data\\Localization\\english\\global.ini")
+    corrupt(p4k, start, b"\xff\xff\xff\xff")
+    targets = [
+        P4kTarget("dcb", ["Data/Game2.dcb", "Data/Game.dcb"], tmp_path / "dcb"),
+        P4kTarget("global.ini", ["Data/Localization/english/global.ini"], tmp_path / "ini"),
+        P4kTarget("missing", ["Data/nothing.txt"], tmp_path / "missing"),
+    ]
+    results, remaining = extract_native(p4k, targets)
+    assert results == {"dcb": tmp_path / "dcb" / "Data" / "Game2.dcb", "missing": None}
+    assert [t.name for t in remaining] == ["global.ini"]
+    assert not (tmp_path / "ini" / "Data" / "Localization" / "english" / "global.ini.tmp").exists()
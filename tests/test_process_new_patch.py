@@ -0,0 +1,93 @@
+import importlib.util
+
+import pytest
+
+from conftest import REPO_ROOT
+
+spec = importlib.util.spec_from_file_location("process_new_patch", REPO_ROOT / "scripts" / "process-new-patch.py")
+process_new_patch = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(process_new_patch)
+diff_ini = process_new_patch.diff_ini
+write_ini_entries = process_new_patch.write_ini_entries
+
+# key: (old stock, old remix, new stock, merged value, category); None = key absent
+CASES = {
+    "added":      (None, None, "new", "new", "added"),
+    "untouched":  ("x", "x", "x", "x", "unchanged"),
+    "kept":       ("x", "C1A x", "x", "C1A x", "kept_remix"),
+    "stock_move": ("x", "x", "y", "y", "changed"),
+    "conflict":   ("x", "C1A x", "y", "C1A x", "conflicts"),
+    "picked_up":  ("x", "C1A x", "C1A x", "C1A x", "unchanged"),  # stock took the remix fix
+    "no_base":    (None, "C1A x", "x", "C1A x", "kept_remix"),    # missing from old stock
+    "gone":       ("x", "x", None, None, "removed"),
+}
+
+
+def build(cases):
+    old_stock, old_remix, new_stock = {}, {}, {}
+    for key, values in cases.items():
+        for table, value in zip((old_stock, old_remix, new_stock), values[:3]):
+            if value is not None:
+                table[key] = value
+    return old_stock, old_remix, new_stock
+
+
+def category(changes, key):
+    for name in ("added", "removed", "changed"):
+        if key in changes[name]:
+            return name
+    if key in [c["key"] for c in changes["conflicts"]]:
+        return "conflicts"
+    return None
+
+
+@pytest.mark.parametrize("key", CASES)
+def test_diff_ini_classifies_each_key(key):
+    old_stock, old_remix, new_stock = build(CASES)
+    merged, changes = diff_ini(old_stock, old_remix, new_stock)
+    expected_value, expected_category = CASES[key][3:]
+    assert merged.get(key) == expected_value
+    if expected_category in ("kept_remix", "unchanged"):
+        assert category(changes, key) is None
+    else:
+        assert category(changes, key) == expected_category
+
+
+def test_diff_ini_counts_and_order():
+    old_stock, old_remix, new_stock = build(CASES)
+    merged, changes = diff_ini(old_stock, old_remix, new_stock)
+    assert list(merged) == list(new_stock)
+    assert (changes["kept_remix"], changes["unchanged"]) == (2, 2)
+    assert changes["conflicts"] == [{"key": "conflict", "old_stock": "x", "new_stock": "y", "remix": "C1A x"}]
+
+
+def test_diff_ini_without_old_stock():
+    old_remix = {"kept": "C1A x", "same": "x", "gone": "x"}
+    new_stock = {"kept": "x", "same": "x", "added": "new"}
+    merged, changes = diff_ini(None, old_remix, new_stock)
+    assert merged == {"kept": "C1A x", "same": "x", "added": "new"}
+    assert (changes["kept_remix"], changes["unchanged"]) == (1, 1)
+    assert (changes["added"], changes["removed"], changes["changed"], changes["conflicts"]) == (
+        ["added"], ["gone"], [], [])
+
+
+def test_diff_ini_forces_version_key():
+    old_stock = {"Frontend_PU_Version": "Alpha 4.3.1"}
+    old_remix = {"Frontend_PU_Version": "Alpha 4.3.1 - ca1usss version"}
+    new_stock = {"Frontend_PU_Version": "Alpha 4.3.2"}
+    merged, changes = diff_ini(old_stock, old_remix, new_stock)
+    assert merged == {"Frontend_PU_Version": "Alpha 4.3.2 - ca1usss version"}
+    assert changes["changed"] == ["Frontend_PU_Version"] and not changes["conflicts"]
+
+
+def test_write_ini_entries(tmp_path):
+    path = tmp_path / "global.ini"
+    entries = {"b": "2", "a": "1=one"}
+
+    assert write_ini_entries(path, entries)
+    assert path.read_bytes() == b"\xef\xbb\xbfb=2\na=1=one\n"
+    assert not write_ini_entries(path, entries)
+
+    assert write_ini_entries(path, entries, sort_keys=True)
+    assert path.read_bytes() == b"\xef\xbb\xbfa=1=one\nb=2\n"
+    assert not write_ini_entries(path, dict(sorted(entries.items())))
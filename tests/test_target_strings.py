@@ -0,0 +1,69 @@
+import pytest
+
+from conftest import TARGET_STRINGS
+from target_strings import TargetStrings, parse_marker
+
+
+@pytest.mark.parametrize("text, expected", [
+    (";commodities start", ("commodities", False)),
+    (";commodities end", ("commodities", True)),
+    (";Ship Weapons", ("ship weapons", False)),
+    (";ships end", ("ships", True)),
+    (";ui/menu items", ("ui/menu items", False)),
+    (";TODO check the Medipin names", (None, False)),
+    ("; end", (None, False)),
+    (";", (None, False)),
+])
+def test_parse_marker(text, expected):
+    assert parse_marker(text) == expected
+
+
+def test_round_trip_of_real_file(tmp_path):
+    raw = TARGET_STRINGS.read_bytes()
+    assert raw.startswith(b"\xef\xbb\xbf")
+
+    doc = TargetStrings.load(TARGET_STRINGS)
+    assert doc.render().encode(doc.encoding) == raw
+
+    # Setting every value to itself writes nothing
+    for entry in doc:
+        assert not entry.set(entry.value)
+    assert not doc.save(tmp_path / "target_strings.ini")
+
+
+def test_sections_of_real_file():
+    doc = TargetStrings.load(TARGET_STRINGS)
+    assert list(doc.sections) == ["ship weapons", "commodities", "special stuff", "ships", "ui/menu items"]
+
+    keys = {name: [e.key for e in doc.section(name)] for name in doc.sections}
+    assert keys["ship weapons"][0] == "item_NameAMRS_LaserCannon_S1"
+    assert all(k.startswith("item_Name") for k in keys["ship weapons"])
+    assert all(k.startswith("items_commodities_") for k in keys["commodities"])
+    assert "items_commodities_carinite_pure" in keys["special stuff"]
+    assert all(k.startswith("vehicle_Name") for k in keys["ships"])
+    assert all(k.startswith("ui_") for k in keys["ui/menu items"])
+    assert sum(map(len, keys.values())) == len(doc.entries)
+
+
+def test_comments_do_not_start_sections(tmp_path):
+    path = tmp_path / "target_strings.ini"
+    path.write_bytes(b";commodities start\na=1\n;TODO more\nb=2\n;commodities end\nc=3\n")
+    doc = TargetStrings.load(path)
+    assert list(doc.sections) == ["commodities"]
+    assert [e.key for e in doc.section("commodities")] == ["a", "b"]
+    assert [e.section for e in doc] == ["commodities", "commodities", None]
+
+
+def test_edit_only_rewrites_changed_line(tmp_path):
+    path = tmp_path / "target_strings.ini"
+    path.write_bytes(TARGET_STRINGS.read_bytes())
+    doc = TargetStrings.load(path)
+    entry = doc.section("commodities")[0]
+    assert entry.set("Astatine 1.0k/SCU")
+    assert doc.save()
+
+    before = TARGET_STRINGS.read_bytes().splitlines(keepends=True)
+    after = path.read_bytes().splitlines(keepends=True)
+    changed = [i for i, (a, b) in enumerate(zip(before, after)) if a != b]
+    assert len(before) == len(after) and changed == [entry.line_no]
+    assert after[entry.line_no] == b"items_commodities_Astatine=Astatine 1.0k/SCU\n"